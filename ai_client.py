@@ -0,0 +1,508 @@
+"""
+Shared, pooled AI client used by every Streamlit session in the process.
+
+Wraps the Anthropic SDK with a sized connection pool, per-request timeouts
+and a process-wide cap on in-flight requests. It can
+optionally drive the async SDK client from a background event loop, so
+blocking Streamlit script threads only wait on futures rather than
+holding sockets themselves.
+
+Every call runs against a per-question deadline. Transient failures
+(connection errors, timeouts, 408/409/429/5xx) are retried with jittered
+exponential backoff for as long as the remaining deadline allows. Blocking
+calls can be hedged: once a call runs past a latency percentile of recent
+calls, a second identical request is raised and the first to succeed wins.
+The losing request holds a concurrency slot until it ends, and its usage is
+reported through on_discarded_usage since nobody reads its answer.
+A circuit breaker counts consecutive transient failures and, while open,
+fails calls immediately with CircuitOpenError so callers can fall back.
+
+SingleFlight coalesces identical concurrent calls: the first caller for a
+key makes the request and everyone else asking for the same key meanwhile
+waits on its future.
+"""
+
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+
+import anthropic
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class ConcurrencyLimitError(RuntimeError):
+    """Raised when no request slot frees up within the acquire timeout"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call's deadline runs out before it succeeds"""
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an SDK error is worth retrying and counts against upstream health"""
+    if isinstance(error, anthropic.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial call through after a cool-down"""
+
+    # Token for calls let through while the breaker is closed; they never hold the trial
+    PASS = object()
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None  # token of the running trial call, while half-open
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        """A token for the call to hand back to release_trial() when it ends, or None to reject it"""
+        with self._lock:
+            if self._opened_at is None:
+                return self.PASS
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial is not None:
+                return None
+            self._trial = object()
+            return self._trial
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def release_trial(self, token):
+        """End the call holding token; frees the trial slot only if that call was the trial"""
+        with self._lock:
+            if token is not None and token is self._trial:
+                self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"AI circuit breaker opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._trial = None
+
+
+class LatencyWindow:
+    """Recent successful call latencies, for picking the hedge delay"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float):
+        """The pct-th percentile latency, or None until enough samples exist"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class AIClient:
+    """Anthropic client with a global concurrency limit and retry/hedge/breaker policy"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        request_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_concurrent_requests: int = 8,
+        acquire_timeout: float = 10.0,
+        use_async: bool = False,
+        deadline: float = 20.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.25,
+        retry_max_delay: float = 4.0,
+        hedge_percentile: float = 0,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        on_discarded_usage=None,
+    ):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.acquire_timeout = acquire_timeout
+        self.request_timeout = request_timeout
+        self.use_async = use_async
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_percentile = hedge_percentile
+        self.on_discarded_usage = on_discarded_usage
+        self.breaker = CircuitBreaker(breaker_failure_threshold, breaker_reset_timeout)
+        self.latencies = LatencyWindow()
+        self.counts = {"retries": 0, "hedges": 0, "hedge_wins": 0, "hedges_discarded": 0, "rejected": 0}
+        self._slots = threading.BoundedSemaphore(max_concurrent_requests)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._hedge_pool = (
+            ThreadPoolExecutor(max_workers=max_concurrent_requests * 2, thread_name_prefix="ai-hedge")
+            if hedge_percentile
+            else None
+        )
+
+        # The SDK's own Timeout and Limits types, so the client works whichever HTTP library the
+        # SDK is built on; retries are done here, within the deadline, rather than by the SDK
+        timeout = anthropic.Timeout(request_timeout, connect=connect_timeout)
+        limits = type(anthropic._constants.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max_connections, max_keepalive_connections=max_keepalive_connections
+        )
+        if use_async:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="ai-client-loop", daemon=True).start()
+            self._client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=0,
+                http_client=anthropic.DefaultAsyncHttpxClient(limits=limits, timeout=timeout),
+            )
+        else:
+            self._loop = None
+            self._client = anthropic.Anthropic(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=0,
+                http_client=anthropic.DefaultHttpxClient(limits=limits, timeout=timeout),
+            )
+        # Mirror the SDK surface so call sites keep using client.messages.create/stream
+        self.messages = _Messages(self)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _acquire(self, timeout: float = None) -> bool:
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire(blocking=False)
+        if acquired:
+            with self._lock:
+                self._in_flight += 1
+        return acquired
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    @contextmanager
+    def _slot(self):
+        if not self._acquire(self.acquire_timeout):
+            raise ConcurrencyLimitError(
+                f"All {self.max_concurrent_requests} AI request slots busy for {self.acquire_timeout}s"
+            )
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _check_breaker(self):
+        """The breaker's token for this call; raises at once while the breaker is open"""
+        token = self.breaker.allow()
+        if token is None:
+            self._count("rejected")
+            raise CircuitOpenError("AI service marked unavailable by the circuit breaker")
+        return token
+
+    def _retry_or_raise(self, error: Exception, attempt: int, deadline: float) -> int:
+        """Sleep before the next attempt, or re-raise when out of retries or time; returns the next attempt number"""
+        if not is_transient(error):
+            raise error
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            raise error
+        # Full jitter, but never sooner than the server asked for
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if time.monotonic() + delay >= deadline:
+            raise error
+        logger.info(f"Retrying AI call in {delay:.2f}s after: {error}")
+        self._count("retries")
+        time.sleep(delay)
+        return attempt + 1
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(f"AI call exceeded its {self.deadline}s deadline")
+        return remaining
+
+    def _run(self, coroutine, timeout: float):
+        """Run a coroutine on the background loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def _create_once(self, params: dict, timeout: float):
+        started = time.monotonic()
+        if self.use_async:
+            response = self._run(self._client.messages.create(**params, timeout=timeout), timeout)
+        else:
+            response = self._client.messages.create(**params, timeout=timeout)
+        self.latencies.add(time.monotonic() - started)
+        return response
+
+    def _create_hedged(self, params: dict, timeout: float):
+        """One attempt, plus a backup request if the first is slower than usual"""
+        hedge_after = self.latencies.percentile(self.hedge_percentile) if self._hedge_pool else None
+        if hedge_after is None or hedge_after >= timeout:
+            return self._create_once(params, timeout)
+
+        primary = self._hedge_pool.submit(self._create_once, params, timeout)
+        done, _ = wait([primary], timeout=hedge_after)
+        # Only hedge with a spare slot; hedges must not crowd out other users' first requests
+        if done or not self._acquire():
+            return primary.result()
+        self._count("hedges")
+
+        backup = self._hedge_pool.submit(self._create_once, params, timeout - hedge_after)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    # The caller's slot goes with the winner; the hedge's slot stays with the loser until it ends
+                    loser = primary if future is backup else backup
+                    loser.add_done_callback(lambda loser: self._finish_loser(loser, params))
+                    return future.result()
+                error = future.exception()
+        self._release()
+        raise error
+
+    def _finish_loser(self, future: Future, params: dict):
+        """Free the slot of a request that lost a hedge race and account for the tokens it used"""
+        self._release()
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._count("hedges_discarded")
+        if self.on_discarded_usage:
+            try:
+                self.on_discarded_usage(params["model"], future.result().usage)
+            except Exception:
+                logger.exception("Failed to record usage of a discarded hedge request")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counts)
+        stats["in_flight"] = self._in_flight
+        stats["breaker"] = self.breaker.state
+        return stats
+
+
+class _Messages:
+    def __init__(self, owner: AIClient):
+        self._owner = owner
+
+    def create(self, **params):
+        owner = self._owner
+        deadline = time.monotonic() + owner.deadline
+        # Checked before taking a slot, so an open breaker fails fast instead of queueing
+        token = owner._check_breaker()
+        try:
+            with owner._slot():
+                attempt = 0
+                while True:
+                    try:
+                        response = owner._create_hedged(params, owner._remaining(deadline))
+                    except Exception as e:
+                        attempt = owner._retry_or_raise(e, attempt, deadline)
+                        continue
+                    owner.breaker.record_success()
+                    return response
+        finally:
+            owner.breaker.release_trial(token)
+
+    @contextmanager
+    def stream(self, **params):
+        """Retries apply until the stream opens; once text has been yielded a failure is final"""
+        owner = self._owner
+        deadline = time.monotonic() + owner.deadline
+        token = owner._check_breaker()
+        try:
+            with owner._slot():
+                attempt = 0
+                while True:
+                    stack = ExitStack()
+                    try:
+                        timeout = owner._remaining(deadline)
+                        if owner.use_async:
+                            stream = stack.enter_context(_AsyncStreamBridge(owner, {**params, "timeout": timeout}))
+                        else:
+                            stream = stack.enter_context(owner._client.messages.stream(**params, timeout=timeout))
+                        break
+                    except Exception as e:
+                        stack.close()
+                        attempt = owner._retry_or_raise(e, attempt, deadline)
+                with stack:
+                    try:
+                        yield stream
+                    except Exception as e:
+                        if is_transient(e):
+                            owner.breaker.record_failure()
+                        raise
+                    owner.breaker.record_success()
+        finally:
+            owner.breaker.release_trial(token)
+
+
+class _AsyncStreamBridge:
+    """Exposes an async SDK message stream to synchronous callers"""
+
+    _OPENED = object()
+    _DONE = object()
+
+    def __init__(self, owner: AIClient, params: dict):
+        self._owner = owner
+        self._timeout = params.get("timeout", owner.request_timeout)
+        self._queue = queue.Queue()
+        self._final_message = None
+        self._future = asyncio.run_coroutine_threadsafe(self._pump(params), owner._loop)
+
+    async def _pump(self, params: dict):
+        try:
+            async with self._owner._client.messages.stream(**params) as stream:
+                self._queue.put(self._OPENED)
+                async for text in stream.text_stream:
+                    self._queue.put(text)
+                self._final_message = await stream.get_final_message()
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            self._queue.put(self._DONE)
+
+    def __enter__(self):
+        # Wait for the request to open so connection errors surface here and can be retried
+        try:
+            item = self._queue.get(timeout=self._timeout)
+        except queue.Empty:
+            self._future.cancel()
+            raise DeadlineExceededError("AI stream did not open before its deadline")
+        if isinstance(item, Exception):
+            raise item
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self._future.done():
+            self._future.cancel()
+
+    @property
+    def text_stream(self):
+        while True:
+            item = self._queue.get(timeout=self._timeout)
+            if item is self._DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def get_final_message(self):
+        self._future.result(timeout=self._timeout)
+        return self._final_message
+
+
+class SingleFlight:
+    """Shares one in-flight call per key between concurrent callers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def claim(self, key: str):
+        """Return (future, is_leader); the leader must resolve() the key when done"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.executed += 1
+            return future, True
+
+    def resolve(self, key: str, result=None, error: BaseException = None):
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn):
+        """Run fn once for all concurrent callers with the same key and share its result"""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except Exception as e:
+            self.resolve(key, error=e)
+            raise
+        except BaseException:
+            self.resolve(key, error=RuntimeError("Shared call was abandoned by its leader"))
+            raise
+        self.resolve(key, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "deduplicated": self.deduplicated, "in_flight": len(self._calls)}
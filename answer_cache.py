@@ -0,0 +1,339 @@
+"""
+Two-tier cache for model answers.
+
+An in-process LRU answers repeat questions without touching disk; behind
+it a SQLite table in team_answers.db keeps answers across restarts and
+shares them between processes. Both tiers expire entries after a TTL.
+
+Keys combine the normalized question, a hash of the retrieved context, the
+asker's role and the model parameters, so an answer is only reused when
+the model would have been given the same prompt.
+
+Paraphrased questions ("who is on call", "whos oncall this week") miss the
+exact key, so each question in the in-memory tier is also indexed by MinHash
+signature in an LSH table. A lookup that misses falls back to the most
+similar earlier question, but only within the same scope: role, model
+parameters and the context. Retrieved passages shift with the wording, so
+callers can anchor the scope on something paraphrases share instead (the
+routed intent's pinned context) and compare only the words left once the
+intent phrase is removed. Entries leave the LSH table when they are evicted
+from the in-memory tier or expire, so it never outgrows the LRU.
+"""
+
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Set
+
+BASE_DIR = Path(__file__).parent
+CACHE_PATH = BASE_DIR / "team_answers.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS questions (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    question TEXT NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Words that carry no meaning for matching paraphrases. Unlike the search
+# stopwords, "on"/"off"/"in" are kept so "on call" still means something.
+FILLER_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "currently", "do", "does", "engineer",
+    "for", "from", "i", "is", "it", "me", "my", "now", "of", "or", "our", "please", "right", "s",
+    "tell", "the", "this", "to", "today", "was", "we", "week", "what", "whats", "who", "whos",
+    "you", "your",
+}
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("Who's on call?" -> "whos on call")"""
+    return _NON_WORD.sub(" ", _APOSTROPHES.sub("", question.lower())).strip()
+
+
+def context_hash(context: str) -> str:
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+def make_scope_key(context: str, role: str, model_params: dict) -> str:
+    """Everything besides the question that shapes the prompt"""
+    parts = [context_hash(context), role, json.dumps(model_params, sort_keys=True)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def make_cache_key(question: str, context: str, role: str, model_params: dict) -> str:
+    """Stable key for one (question, context, role, model settings) combination"""
+    scope = make_scope_key(context, role, model_params)
+    return hashlib.sha256(f"{normalize_question(question)}\x1f{scope}".encode("utf-8")).hexdigest()
+
+
+def question_shingles(question: str) -> Set[str]:
+    """Character shingles of the question's content words, spacing ignored ("on-call" == "oncall")"""
+    text = "".join(w for w in normalize_question(question).split() if w not in FILLER_WORDS)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+class MinHashLSH:
+    """MinHash signatures banded into hash buckets for near-duplicate lookup"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._buckets = {}
+        self._signatures = {}  # key -> (scope, signature)
+        self._lock = threading.Lock()
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, scope: str, signature: List[int]):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield (scope, band, tuple(rows))
+
+    def add(self, scope: str, key: str, shingles: Set[str]):
+        if not shingles:
+            return
+        signature = self.signature(shingles)
+        with self._lock:
+            self._discard(key)
+            self._signatures[key] = (scope, signature)
+            for band_key in self._band_keys(scope, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+
+    def _discard(self, key: str):
+        entry = self._signatures.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(*entry):
+            keys = self._buckets.get(band_key)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[band_key]
+
+    def remove(self, key: str):
+        """Drop a key and any band buckets left empty by it"""
+        with self._lock:
+            self._discard(key)
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def query(self, scope: str, shingles: Set[str], threshold: float) -> List[tuple]:
+        """(estimated Jaccard similarity, key) of indexed entries at or above threshold, best first"""
+        if not shingles:
+            return []
+        signature = self.signature(shingles)
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(scope, signature):
+                candidates |= self._buckets.get(band_key, set())
+            scored = []
+            for key in candidates:
+                other = self._signatures[key][1]
+                similarity = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+                if similarity >= threshold:
+                    scored.append((similarity, key))
+        return sorted(scored, reverse=True)
+
+
+class AnswerCache:
+    """In-memory LRU in front of an on-disk SQLite tier, both with a TTL"""
+
+    def __init__(
+        self,
+        path=CACHE_PATH,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.6,
+    ):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._lsh = MinHashLSH()
+        # Expired entries are swept at most this often, on writes
+        self.prune_interval = min(ttl_seconds, 60)
+        self._pruned_at = time.monotonic()
+        cutoff = time.time() - ttl_seconds
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute("DELETE FROM answers WHERE created < ?", (cutoff,))
+            conn.execute("DELETE FROM questions WHERE created < ?", (cutoff,))
+            if similarity_threshold:
+                # Warm the in-memory tier, and with it the LSH table, with the newest answers
+                rows = conn.execute(
+                    "SELECT q.key, q.scope, q.question, a.answer, a.created FROM questions q"
+                    " JOIN answers a ON a.key = q.key ORDER BY a.created DESC LIMIT ?",
+                    (max_entries,),
+                ).fetchall()
+                for key, scope, question, answer, created in reversed(rows):
+                    self._remember(key, answer, created)
+                    self._lsh.add(scope, key, question_shingles(question))
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite connections cannot be shared across Streamlit session threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, answer: str, created: float):
+        evicted = []
+        with self._lock:
+            self._memory[key] = (answer, created)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                evicted.append(self._memory.popitem(last=False)[0])
+        for old_key in evicted:
+            self._lsh.remove(old_key)
+
+    def _prune(self):
+        """Drop expired entries from both tiers and the LSH table"""
+        now = time.monotonic()
+        if now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [key for key, (_, created) in self._memory.items() if created < cutoff]
+            for key in expired:
+                del self._memory[key]
+        for key in expired:
+            self._lsh.remove(key)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers WHERE created < ?", (cutoff,))
+            conn.execute("DELETE FROM questions WHERE created < ?", (cutoff,))
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def _fetch(self, key: str):
+        """(answer, tier) for a live entry, or (None, None)"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] >= cutoff:
+                    self._memory.move_to_end(key)
+                    return entry[0], "memory_hits"
+                del self._memory[key]
+                self._lsh.remove(key)
+
+        row = self._connect().execute(
+            "SELECT answer, created FROM answers WHERE key = ? AND created >= ?", (key, cutoff)
+        ).fetchone()
+        if row is None:
+            return None, None
+        self._remember(key, row[0], row[1])
+        return row[0], "disk_hits"
+
+    def get(self, key: str):
+        """Return the cached answer for key, or None on a miss"""
+        answer, tier = self._fetch(key)
+        self._count(tier or "misses")
+        return answer
+
+    def put(self, key: str, answer: str):
+        created = time.time()
+        self._remember(key, answer, created)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers(key, answer, created) VALUES (?, ?, ?)",
+                (key, answer, created),
+            )
+
+    def lookup(
+        self, question: str, context: str, role: str, model_params: dict,
+        anchor: str = None, match_text: str = None,
+    ) -> Optional[str]:
+        """Answer for this exact question, else for a close paraphrase asked in the same scope.
+
+        The scope defaults to the full context; anchor replaces it with text
+        that stays the same across paraphrases, and match_text replaces the
+        question in the similarity comparison.
+        """
+        answer, tier = self._fetch(make_cache_key(question, context, role, model_params))
+        if answer is None and self.similarity_threshold:
+            scope = make_scope_key(anchor or context, role, model_params)
+            shingles = question_shingles(match_text or question)
+            for _, key in self._lsh.query(scope, shingles, self.similarity_threshold):
+                # An expired candidate is dropped from the LSH table by _fetch
+                answer, _ = self._fetch(key)
+                if answer is not None:
+                    tier = "semantic_hits"
+                    break
+        self._count(tier or "misses")
+        return answer
+
+    def store(
+        self, question: str, context: str, role: str, model_params: dict, answer: str,
+        anchor: str = None, match_text: str = None,
+    ):
+        """Cache an answer and index its question for paraphrase lookups, scoped as in lookup"""
+        self._prune()
+        scope = make_scope_key(anchor or context, role, model_params)
+        key = make_cache_key(question, context, role, model_params)
+        question = match_text or question
+        self.put(key, answer)
+        if self.similarity_threshold:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO questions(key, scope, question, created) VALUES (?, ?, ?, ?)",
+                    (key, scope, question, time.time()),
+                )
+            self._lsh.add(scope, key, question_shingles(question))
+            with self._lock:
+                evicted = key not in self._memory
+            if evicted:
+                # Pushed out of the LRU by concurrent writes before it was indexed
+                self._lsh.remove(key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters since start-up plus the overall hit rate"""
+        with self._lock:
+            counts = dict(self._counts)
+            counts["memory_entries"] = len(self._memory)
+        counts["indexed_questions"] = len(self._lsh)
+        hits = counts["memory_hits"] + counts["disk_hits"] + counts["semantic_hits"]
+        lookups = hits + counts["misses"]
+        counts["hit_rate"] = hits / lookups if lookups else 0.0
+        return counts
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the chatbot's hot paths.
+
+Times get_relevant_context over a question corpus that reaches every intent,
+the unknown-person guard and the generic fallback for every test account;
+generate_answer_with_ai in demo mode and against the local mock Messages API;
+authenticate_user; and each dashboard's compile_*_dashboard and
+render_*_dashboard functions, called directly so Streamlit's own script
+rerun overhead is not part of the timing.
+
+Results are compared with a JSON baseline and the run fails (exit code 1)
+when any benchmark's median is slower than the baseline by more than the
+threshold:
+    python benchmark.py --save-baseline      # record benchmark_baseline.json
+    python benchmark.py --threshold 0.25     # compare against it
+Baselines are machine specific, so none is committed; record one on the
+machine that runs the check. Without a baseline, or when a benchmark has no
+entry in it, the run fails (exit code 2) rather than passing a check it
+never made.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Every generate_answer_with_ai call should reach the model path rather than the answer cache
+os.environ["LOYALTYAI_ANSWER_CACHE"] = "false"
+
+import streamlit as st
+
+import team_chatbot
+from ai_client import AIClient
+from mock_anthropic_server import MockSettings, start_server
+
+BASE_DIR = Path(__file__).parent
+BASELINE_PATH = BASE_DIR / "benchmark_baseline.json"
+DEFAULT_THRESHOLD = float(os.getenv("LOYALTYAI_BENCH_THRESHOLD", "0.25"))
+
+# Questions that don't hit an intent phrase: unknown person, generic and docs-only
+EXTRA_QUESTIONS = [
+    "who is bob",
+    "tell me about priya",
+    "what time is lunch",
+    "how do we roll back a failed kubernetes deployment",
+    "what does the loyalty points service do",
+]
+
+DASHBOARD_TYPES = ["individual", "senior_engineer", "director", "engineering_manager", "product_manager", "scrum_master"]
+# Calls per timed batch; compiling is pure Python and takes microseconds
+COMPILE_CALLS = 500
+RENDER_CALLS = 50
+
+
+def question_corpus() -> list:
+    """One question per intent, built from its first phrase, plus the non-intent branches"""
+    return [phrases[0] for _, phrases, _, _ in team_chatbot.INTENT_RULES] + EXTRA_QUESTIONS
+
+
+def dashboard_benchmarks(dashboard_type: str) -> dict:
+    """Compile and render benchmarks for one dashboard type, called outside any script run"""
+    username = next(name for name, user in team_chatbot.USERS.items() if user["dashboard_type"] == dashboard_type)
+    user_info = team_chatbot.USERS[username]
+    compile_fn = team_chatbot.DASHBOARD_COMPILERS[dashboard_type]
+    render_fn = getattr(team_chatbot, f"render_{dashboard_type}_dashboard")
+
+    def compile_dashboard():
+        data, _ = team_chatbot.dashboard_snapshot(dashboard_type)
+        for _ in range(COMPILE_CALLS):
+            compile_fn(data, username.split(".")[0])
+
+    def render_dashboard():
+        st.session_state["username"] = username
+        for _ in range(RENDER_CALLS):
+            render_fn(user_info)
+
+    return {
+        compile_fn.__name__: (compile_dashboard, COMPILE_CALLS),
+        render_fn.__name__: (render_dashboard, RENDER_CALLS),
+    }
+
+
+def collect_benchmarks(use_mock: bool = True) -> dict:
+    """name -> (callable running one batch, calls per batch)"""
+    questions = question_corpus()
+    users = list(team_chatbot.USERS.values())
+    cases = [(question, user) for user in users for question in questions]
+    contexts = [(question, team_chatbot.get_relevant_context(question, user), user) for question, user in cases]
+
+    def relevant_context():
+        for question, user in cases:
+            team_chatbot.get_relevant_context(question, user)
+
+    def answer_demo():
+        for question, context, user in contexts:
+            team_chatbot.generate_answer_with_ai(question, context, None, user)
+
+    def authenticate():
+        for username in team_chatbot.USERS:
+            team_chatbot.authenticate_user(username, "optum123")
+            team_chatbot.authenticate_user(username, "wrong-password")
+
+    benchmarks = {
+        "get_relevant_context": (relevant_context, len(cases)),
+        "generate_answer_with_ai[demo]": (answer_demo, len(contexts)),
+        "authenticate_user": (authenticate, 2 * len(team_chatbot.USERS)),
+    }
+
+    if use_mock:
+        # Zero model latency and instant tokens, so only our own overhead is timed
+        _, base_url = start_server(MockSettings(latency="fixed:0", tokens_per_second=1e6, output_tokens=60, seed=0))
+        client = AIClient(api_key="mock", base_url=base_url, max_concurrent_requests=4)
+        sample = contexts[:: max(1, len(contexts) // 40)]
+
+        def answer_mock():
+            for question, context, user in sample:
+                answer = team_chatbot.generate_answer_with_ai(question, context, client, user)
+                if not answer.startswith("Mock answer"):
+                    raise RuntimeError(f"Mock call failed: {answer}")
+
+        benchmarks["generate_answer_with_ai[mock]"] = (answer_mock, len(sample))
+
+    for dashboard_type in DASHBOARD_TYPES:
+        benchmarks.update(dashboard_benchmarks(dashboard_type))
+    return benchmarks
+
+
+def time_benchmark(fn, calls: int, repeat: int, warmup: int) -> dict:
+    """Per-call timings in milliseconds over `repeat` batches"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000 / calls)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "calls_per_batch": calls,
+        "batches": repeat,
+    }
+
+
+def missing_from_baseline(results: dict, baseline: dict) -> list:
+    """Benchmarks this run timed that the baseline has nothing to compare with"""
+    return [name for name in results if name not in baseline]
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """(name, baseline median, current median) for benchmarks slower than baseline * (1 + threshold)"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["median_ms"] > previous["median_ms"] * (1 + threshold):
+            regressions.append((name, previous["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15, help="timed batches per benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed batches per benchmark")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", "--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed median slowdown, 0.25 = 25%%")
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--no-mock", action="store_true", help="skip the mock Messages API benchmark")
+    parser.add_argument("--output", type=Path, help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    benchmarks = collect_benchmarks(use_mock=not args.no_mock)
+    results = {}
+    for name, (fn, calls) in benchmarks.items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = time_benchmark(fn, calls, args.repeat, args.warmup)
+        result = results[name]
+        print(f"⏱️  {name:42} median {result['median_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"❌ No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 2
+
+    baseline = json.loads(args.baseline.read_text())
+    missing = missing_from_baseline(results, baseline)
+    for name in missing:
+        print(f"❌ {name} is not in the baseline at {args.baseline}; run with --save-baseline to record it")
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, before, after in regressions:
+        print(f"🐢 {name} regressed: {before:.3f} ms -> {after:.3f} ms (+{(after / before - 1):.0%})")
+    if regressions:
+        return 1
+    if missing:
+        return 2
+    print(f"✅ No benchmark regressed more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
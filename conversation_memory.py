@@ -0,0 +1,124 @@
+"""
+Bounded conversation memory: recent turns kept verbatim, older ones folded into a summary.
+
+The app keeps at most a fixed number of messages per session. When it runs
+over, the oldest messages are compacted into a rolling summary, by the model
+when one is available or extractively otherwise. Follow-up questions get the
+summary and the most recent turns as multi-turn context; standalone
+questions are sent without it, so their prompts stay short and their answers
+stay shareable through the answer cache.
+"""
+
+import hashlib
+import json
+import re
+
+from token_estimate import estimate_tokens
+
+# Pronouns that point back at something said earlier, unless the question itself
+# names something before them ("does scott know his dates" is standalone)
+FOLLOW_UP_PRONOUNS = frozenset("he him his she her they them their it its".split())
+# Words that only point back when the question has nothing else to go on ("what else", "why that")
+FOLLOW_UP_WORDS = frozenset("that those this these else more again".split())
+# Openers that continue the previous question ("and scott?", "what about britney")
+FOLLOW_UP_OPENERS = ("and", "also", "but", "so", "then", "what about", "how about")
+# Words that cannot be what a pronoun refers to
+FUNCTION_WORDS = frozenset(
+    "a an the of to for in on at about with from by me i you your my we our us please s re ll t d "
+    "what who whom whose where when why how which is are was were be been am do does did doing "
+    "can could would should will tell say said give show know explain mean".split()
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def is_follow_up(question: str) -> bool:
+    """Whether the question likely depends on earlier turns.
+
+    Only a continuation opener, or a pronoun with no word before it in the
+    question that it could refer to, counts; common words such as "it" or
+    "more" in an otherwise self-contained question do not.
+    """
+    words = re.findall(r"[a-z]+", question.lower())
+    opening = " ".join(words[:2])
+    if any(opening == opener or opening.startswith(opener + " ") for opener in FOLLOW_UP_OPENERS):
+        return True
+    named = False
+    for word in words:
+        if word in FOLLOW_UP_PRONOUNS and not named:
+            return True
+        if word not in FUNCTION_WORDS and word not in FOLLOW_UP_PRONOUNS and word not in FOLLOW_UP_WORDS:
+            named = True
+    return not named and any(word in FOLLOW_UP_WORDS for word in words)
+
+
+def compaction_split(messages: list, max_messages: int) -> int:
+    """How many of the oldest messages to fold into the summary; 0 while under the cap.
+
+    The session is cut back to about half the cap at once, in whole
+    question/answer pairs, so the summary is rebuilt every few turns rather
+    than on every turn past the cap.
+    """
+    if len(messages) <= max_messages:
+        return 0
+    keep = max(2, max_messages // 2)
+    fold = len(messages) - keep
+    return fold - fold % 2
+
+
+def first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = SENTENCE_END.split(" ".join(text.split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[: max_chars - 3].rstrip() + "..."
+
+
+def trim_to_budget(lines: list, budget_tokens: int) -> list:
+    """The newest lines that fit the token budget, in their original order"""
+    kept = []
+    used = 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return kept[::-1]
+
+
+def extractive_summary(previous: str, messages: list, budget_tokens: int) -> str:
+    """Append each folded turn as one line, question plus the answer's first sentence, keeping the newest lines"""
+    lines = previous.splitlines() if previous else []
+    question = None
+    for message in messages:
+        if message["role"] == "user":
+            question = message["content"]
+        elif question is not None:
+            lines.append(f"- Asked \"{first_sentence(question, 120)}\": {first_sentence(message['content'])}")
+            question = None
+    return "\n".join(trim_to_budget(lines, budget_tokens))
+
+
+def transcript(messages: list) -> str:
+    """Plain-text transcript of messages for a summarization prompt"""
+    return "\n".join(f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in messages)
+
+
+def recent_turns(messages: list, max_turns: int, budget_tokens: int) -> list:
+    """The newest whole question/answer pairs that fit the budget, oldest first"""
+    turns = []
+    used = 0
+    end = len(messages) - len(messages) % 2
+    for start in range(end - 2, -1, -2):
+        pair = messages[start:start + 2]
+        if len(turns) >= max_turns or pair[0]["role"] != "user" or pair[1]["role"] != "assistant":
+            break
+        cost = sum(estimate_tokens(m["content"]) for m in pair)
+        if used + cost > budget_tokens:
+            break
+        turns[:0] = [{"role": m["role"], "content": m["content"]} for m in pair]
+        used += cost
+    return turns
+
+
+def conversation_digest(conversation: dict) -> str:
+    """Stable hash of the summary and turns a follow-up answer depends on"""
+    payload = json.dumps([conversation.get("summary", ""), conversation.get("history", [])], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
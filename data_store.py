@@ -0,0 +1,142 @@
+"""
+Lazily loaded, hot-reloaded JSON data sections.
+
+Each section is one JSON file under the data directory (users.json,
+dashboards/director.json, ...). A section is read the first time it is asked
+for, and re-read when its file's mtime or size changes, checked at most once
+per check_interval seconds, so edits go live without a restart. Sections not
+accessed for idle_seconds are dropped, in a sweep that also runs at most once
+per check_interval, so only what is being viewed stays in memory.
+
+snapshot() returns a section's contents and version stamp together; a caller
+that reads a section several times (a dashboard render) takes one snapshot
+and works from it, so it never sees two versions at once. SectionView and
+SectionDirectory expose sections as read-only mappings for scripts that index
+them like the dict literals they replace; each access reads the current
+version.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / "data"
+
+
+class DataStore:
+    """JSON sections loaded on first use and reloaded when their file changes"""
+
+    def __init__(self, data_dir=DATA_DIR, check_interval: float = 1.0, idle_seconds: float = 600):
+        self.data_dir = Path(data_dir)
+        self.check_interval = check_interval
+        self.idle_seconds = idle_seconds
+        self._sections = {}  # name -> [data, version, checked_at, used_at]
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+        self.loads = 0
+
+    def path(self, name: str) -> Path:
+        return self.data_dir / f"{name}.json"
+
+    def _file_version(self, name: str) -> str:
+        stat = os.stat(self.path(name))
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def _load(self, name: str, version: str):
+        with open(self.path(name), encoding="utf-8") as f:
+            data = json.load(f)
+        self.loads += 1
+        logger.info(f"Loaded data section {name} (version {version})")
+        return data
+
+    def _entry(self, name: str) -> list:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sections.get(name)
+            if entry is None or now - entry[2] >= self.check_interval:
+                try:
+                    version = self._file_version(name)
+                    if entry is None or version != entry[1]:
+                        entry = [self._load(name, version), version, now, now]
+                        self._sections[name] = entry
+                except (OSError, ValueError) as e:
+                    # Keep serving the last good copy while a file is mid-edit, missing or malformed
+                    if entry is None:
+                        raise
+                    logger.error(f"Failed to reload data section {name}, keeping version {entry[1]}: {e}")
+                entry[2] = now
+            entry[3] = now
+            if now - self._swept_at >= self.check_interval:
+                self._evict_idle(now)
+            return entry
+
+    def _evict_idle(self, now: float):
+        self._swept_at = now
+        for name in [name for name, entry in self._sections.items() if now - entry[3] > self.idle_seconds]:
+            del self._sections[name]
+
+    def snapshot(self, name: str):
+        """(contents, version stamp) of a section, taken together"""
+        data, version = self._entry(name)[:2]
+        return data, version
+
+    def get(self, name: str):
+        """The current contents of a section"""
+        return self._entry(name)[0]
+
+    def version(self, name: str) -> str:
+        """Version stamp of a section; changes whenever its file does"""
+        return self._entry(name)[1]
+
+    def names(self, directory: str = "") -> list:
+        """Section names directly under a directory of the store"""
+        prefix = f"{directory}/" if directory else ""
+        return sorted(prefix + path.stem for path in (self.data_dir / directory).glob("*.json"))
+
+    def resident(self) -> list:
+        with self._lock:
+            return sorted(self._sections)
+
+
+class SectionView(Mapping):
+    """Read-only mapping over one section; every access reads its current contents"""
+
+    def __init__(self, store: DataStore, name: str):
+        self.store = store
+        self.name = name
+
+    def __getitem__(self, key):
+        return self.store.get(self.name)[key]
+
+    def __iter__(self):
+        return iter(self.store.get(self.name))
+
+    def __len__(self):
+        return len(self.store.get(self.name))
+
+
+class SectionDirectory(Mapping):
+    """Read-only mapping of section name to contents for every section in a directory; each loads on first access"""
+
+    def __init__(self, store: DataStore, directory: str):
+        self.store = store
+        self.directory = directory
+
+    def __getitem__(self, key):
+        try:
+            return self.store.get(f"{self.directory}/{key}")
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return (name.split("/", 1)[1] for name in self.store.names(self.directory))
+
+    def __len__(self):
+        return len(self.store.names(self.directory))
@@ -0,0 +1,459 @@
+"""
+Structure-aware streaming chunker for the team documents in docs/.
+
+Each format is split along its own structure:
+- Markdown by heading hierarchy
+- Java by class and method
+- JSON by object path
+- Plain text by paragraph
+
+Files are read incrementally (line by line, or block by block for JSON)
+and chunks are yielded as soon as they are complete, each with the byte
+offsets it covers, so memory use depends on MAX_CHUNK_BYTES rather than
+on file size.
+"""
+
+import re
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+MAX_CHUNK_BYTES = 2000
+JSON_READ_BYTES = 1 << 16
+
+Chunk = namedtuple("Chunk", ["title", "text", "start", "end"])
+
+MARKDOWN_HEADING = re.compile(rb"^(#{1,6})\s+(.+?)\s*#*\s*$")
+MARKDOWN_FENCE = re.compile(rb"^\s*(```|~~~)")
+JAVA_TYPE = re.compile(r"\b(?:class|interface|enum|record)\s+(\w+)")
+JAVA_METHOD = re.compile(
+    r"^\s*(?:(?:public|protected|private|static|final|abstract|synchronized|native|default)\s+)*"
+    r"(?:<[^>]+>\s+)?[\w<>\[\]?,.\s]+?\s+(\w+)\s*\([^;]*$"
+)
+JAVA_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+JAVA_NOT_METHODS = {"if", "for", "while", "switch", "catch", "return", "new", "else", "try", "synchronized"}
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace").strip()
+
+
+def _iter_lines(path: Path) -> Iterator[tuple]:
+    """Yield (byte offset, line) pairs without reading the whole file"""
+    offset = 0
+    with open(path, "rb") as f:
+        # Bounded readline so a single huge line cannot blow up memory
+        for line in iter(lambda: f.readline(MAX_CHUNK_BYTES), b""):
+            yield offset, line
+            offset += len(line)
+
+
+class _LineBuffer:
+    """Accumulates consecutive lines into a chunk, splitting oversized ones"""
+
+    def __init__(self):
+        self.lines: List[bytes] = []
+        self.start = 0
+        self.size = 0
+        self.title = ""
+        self.overflowed = False
+
+    def add(self, offset: int, line: bytes) -> Optional[Chunk]:
+        chunk = None
+        if self.lines and self.size + len(line) > MAX_CHUNK_BYTES:
+            chunk = self.flush()
+            self.overflowed = True
+        if not self.lines:
+            self.start = offset
+        self.lines.append(line)
+        self.size += len(line)
+        return chunk
+
+    def has_content(self) -> bool:
+        return any(line.strip() for line in self.lines)
+
+    def flush(self) -> Optional[Chunk]:
+        return self.flush_before(len(self.lines))
+
+    def flush_before(self, index: int) -> Optional[Chunk]:
+        """Emit the first index lines as a chunk and keep the rest buffered"""
+        head, tail = self.lines[:index], self.lines[index:]
+        head_size = sum(len(line) for line in head)
+        chunk = None
+        if any(line.strip() for line in head):
+            title = f"{self.title} (cont.)" if self.overflowed else self.title
+            chunk = Chunk(title, _decode(b"".join(head)), self.start, self.start + head_size)
+        self.lines = tail
+        self.start += head_size
+        self.size -= head_size
+        self.overflowed = False
+        return chunk
+
+
+def iter_markdown_chunks(path: Path) -> Iterator[Chunk]:
+    """One chunk per heading section, titled with its heading path"""
+    buffer = _LineBuffer()
+    buffer.title = path.name
+    headings = []
+    in_fence = False
+    for offset, line in _iter_lines(path):
+        if MARKDOWN_FENCE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else MARKDOWN_HEADING.match(line)
+        if heading:
+            level = len(heading.group(1))
+            # Headings directly stacked on each other share one section
+            if any(line.strip() and not MARKDOWN_HEADING.match(line) for line in buffer.lines):
+                chunk = buffer.flush()
+                if chunk:
+                    yield chunk
+            headings = [h for h in headings if h[0] < level] + [(level, _decode(heading.group(2)))]
+            buffer.title = " > ".join(title for _, title in headings)
+        chunk = buffer.add(offset, line)
+        if chunk:
+            yield chunk
+    chunk = buffer.flush()
+    if chunk:
+        yield chunk
+
+
+def _java_code(line: str, in_comment: bool) -> tuple:
+    """Strip comments and literals from a Java line, tracking block comment state"""
+    code = []
+    i = 0
+    while i < len(line):
+        if in_comment:
+            end = line.find("*/", i)
+            if end < 0:
+                return "".join(code), True
+            in_comment = False
+            i = end + 2
+        elif line.startswith("/*", i):
+            in_comment = True
+            i += 2
+        elif line.startswith("//", i):
+            break
+        else:
+            code.append(line[i])
+            i += 1
+    return JAVA_STRING.sub('""', "".join(code)), in_comment
+
+
+def iter_java_chunks(path: Path) -> Iterator[Chunk]:
+    """One chunk for the type header and fields, then one per method with its Javadoc"""
+    buffer = _LineBuffer()
+    buffer.title = path.stem
+    class_name = path.stem
+    depth = 0
+    in_comment = False
+    preamble_index = None  # where the Javadoc/annotations of the next member begin
+    for offset, raw in _iter_lines(path):
+        line = raw.decode("utf-8", errors="replace")
+        stripped = line.strip()
+        code, in_comment_after = _java_code(line, in_comment)
+
+        if depth == 1 and not in_comment and stripped:
+            method = JAVA_METHOD.match(code)
+            if method and method.group(1) not in JAVA_NOT_METHODS:
+                start = len(buffer.lines) if preamble_index is None else preamble_index
+                chunk = buffer.flush_before(start)
+                if chunk:
+                    yield chunk
+                buffer.title = f"{class_name}.{method.group(1)}"
+                preamble_index = None
+            elif stripped.startswith(("/**", "@")):
+                if preamble_index is None:
+                    preamble_index = len(buffer.lines)
+            else:
+                preamble_index = None
+        elif depth == 0:
+            type_decl = JAVA_TYPE.search(code)
+            if type_decl:
+                class_name = type_decl.group(1)
+                buffer.title = class_name
+
+        in_comment = in_comment_after
+        depth = max(0, depth + code.count("{") - code.count("}"))
+        chunk = buffer.add(offset, raw)
+        if chunk:
+            yield chunk
+            preamble_index = None
+    chunk = buffer.flush()
+    if chunk:
+        yield chunk
+
+
+def iter_text_chunks(path: Path) -> Iterator[Chunk]:
+    """Blank-line separated paragraphs, grouped up to MAX_CHUNK_BYTES"""
+    buffer = _LineBuffer()
+    paragraph: List[tuple] = []
+    paragraph_size = 0
+
+    def flush_paragraph():
+        nonlocal paragraph_size
+        if buffer.lines and buffer.size + paragraph_size > MAX_CHUNK_BYTES:
+            yield buffer.flush()
+        for line_offset, line in paragraph:
+            if not buffer.lines:
+                buffer.title = f"{path.name}: {_decode(line)[:80]}"
+            chunk = buffer.add(line_offset, line)
+            if chunk:
+                yield chunk
+        paragraph.clear()
+        paragraph_size = 0
+
+    for offset, line in _iter_lines(path):
+        paragraph.append((offset, line))
+        paragraph_size += len(line)
+        # A paragraph that already fills a chunk is split without waiting for a blank line
+        if not line.strip() or paragraph_size >= MAX_CHUNK_BYTES:
+            yield from (chunk for chunk in flush_paragraph() if chunk)
+    yield from (chunk for chunk in flush_paragraph() if chunk)
+    chunk = buffer.flush()
+    if chunk:
+        yield chunk
+
+
+class _JsonFrame:
+    """An open JSON object or array while streaming"""
+
+    def __init__(self, path: str, start: int, is_object: bool):
+        self.path = path
+        self.start = start
+        self.is_object = is_object
+        self.index = 0
+        self.key = None
+        self.member_start = None
+        self.closed_children = []  # (label, start, end) while the frame still fits in a chunk
+        self.oversized = False
+        self.group = None  # [start, end, first label, last label] of siblings pending emission
+
+    def child_path(self) -> str:
+        if self.is_object:
+            return f"{self.path}.{self.key}" if self.path else str(self.key)
+        return f"{self.path}[{self.index}]"
+
+    def child_label(self) -> str:
+        return str(self.key) if self.is_object else f"[{self.index}]"
+
+
+class _JsonChunker:
+    """Streams a JSON file, emitting the largest object paths that fit in a chunk"""
+
+    STRING_BODY = re.compile(rb'(?:[^"\\]+|\\.)*', re.DOTALL)
+    SCALAR_END = re.compile(rb"[\s,:\]\}]")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+        self.buf = bytearray()
+        self.buf_start = 0
+        self.eof = False
+        self.stack: List[_JsonFrame] = []
+        self.chunks: List[Chunk] = []
+
+    # Buffer management -------------------------------------------------
+
+    def _fill(self) -> bool:
+        data = self.file.read(JSON_READ_BYTES)
+        if not data:
+            self.eof = True
+            return False
+        self.buf.extend(data)
+        return True
+
+    def _bytes(self, start: int, end: int) -> bytes:
+        return bytes(self.buf[start - self.buf_start:end - self.buf_start])
+
+    def _trim(self, pos: int):
+        # Keep only bytes that may still end up in a chunk
+        keep = pos
+        for depth, frame in enumerate(self.stack):
+            if frame.group:
+                keep = min(keep, frame.group[0])
+            if not frame.oversized:
+                keep = min(keep, frame.start)
+                break
+            # An oversized open child emits its own chunks, so its key is no longer needed
+            child = self.stack[depth + 1] if depth + 1 < len(self.stack) else None
+            if frame.member_start is not None and not (child and child.oversized):
+                keep = min(keep, frame.member_start)
+        if keep - self.buf_start > JSON_READ_BYTES:
+            del self.buf[:keep - self.buf_start]
+            self.buf_start = keep
+
+    def _string_end(self, pos: int) -> Optional[int]:
+        """End offset of the string starting at pos, or None if it is never closed.
+
+        Each refill is scanned from where the previous scan stopped, so a
+        long string costs time linear in its length.
+        """
+        i = pos + 1 - self.buf_start
+        while True:
+            # Stops at the closing quote, or at the end of the buffer (possibly before a split escape)
+            i = self.STRING_BODY.match(self.buf, i).end()
+            if i < len(self.buf) and self.buf[i] == ord('"'):
+                return self.buf_start + i + 1
+            if not self._fill():
+                return None
+
+    def _scalar_end(self, pos: int) -> int:
+        """End offset of the number or literal starting at pos"""
+        i = pos - self.buf_start
+        while True:
+            match = self.SCALAR_END.search(self.buf, i)
+            if match:
+                return self.buf_start + match.start()
+            i = len(self.buf)
+            if not self._fill():
+                return self.buf_start + i
+
+    def _peek(self, pos: int) -> Optional[int]:
+        while pos - self.buf_start >= len(self.buf):
+            if not self._fill():
+                return None
+        return self.buf[pos - self.buf_start]
+
+    # Chunk emission ----------------------------------------------------
+
+    def _emit(self, title: str, start: int, end: int):
+        text = _decode(self._bytes(start, end))
+        if text:
+            self.chunks.append(Chunk(title or self.path.name, text, start, end))
+
+    def _child_title(self, frame: _JsonFrame, label: str) -> str:
+        if frame.is_object:
+            return f"{frame.path}.{label}" if frame.path else label
+        return f"{frame.path or self.path.name}{label}"
+
+    def _flush_group(self, frame: _JsonFrame):
+        if frame.group:
+            start, end, first, last = frame.group
+            if first == last:
+                title = self._child_title(frame, first)
+            else:
+                title = f"{frame.path or self.path.name} ({first} .. {last})"
+            self._emit(title, start, end)
+            frame.group = None
+
+    def _add_to_group(self, frame: _JsonFrame, label: str, start: int, end: int):
+        if frame.group and end - frame.group[0] <= MAX_CHUNK_BYTES:
+            frame.group[1] = end
+            frame.group[3] = label
+            return
+        self._flush_group(frame)
+        if end - start > MAX_CHUNK_BYTES:
+            # A single oversized scalar is split into fixed-size pieces
+            for piece_start in range(start, end, MAX_CHUNK_BYTES):
+                piece_end = min(end, piece_start + MAX_CHUNK_BYTES)
+                self._emit(f"{self._child_title(frame, label)} (part)", piece_start, piece_end)
+        else:
+            frame.group = [start, end, label, label]
+
+    def _mark_oversized(self, depth: int):
+        # Everything above an oversized frame is oversized too, so the parent
+        # is already emitting its children as groups
+        frame = self.stack[depth]
+        if depth > 0:
+            self._flush_group(self.stack[depth - 1])
+        frame.oversized = True
+        for label, start, end in frame.closed_children:
+            self._add_to_group(frame, label, start, end)
+        frame.closed_children = []
+
+    def _check_size(self, pos: int):
+        for depth, frame in enumerate(self.stack):
+            if frame.oversized:
+                continue
+            if pos - frame.start <= MAX_CHUNK_BYTES:
+                break
+            self._mark_oversized(depth)
+
+    def _child_closed(self, start: int, end: int, is_container_oversized: bool = False):
+        """Record a completed member/element of the innermost open frame"""
+        if not self.stack:
+            if not is_container_oversized:
+                self._emit(self.path.name, start, end)
+            return
+        frame = self.stack[-1]
+        member_start = frame.member_start if frame.member_start is not None else start
+        label = frame.child_label()
+        if not is_container_oversized:
+            if frame.oversized:
+                self._add_to_group(frame, label, member_start, end)
+            else:
+                frame.closed_children.append((label, member_start, end))
+        frame.member_start = None
+        frame.key = None
+        frame.index += 1
+
+    # Scanning ----------------------------------------------------------
+
+    def __iter__(self) -> Iterator[Chunk]:
+        with open(self.path, "rb") as self.file:
+            pos = 0
+            expecting_key = False
+            while True:
+                char = self._peek(pos)
+                if char is None:
+                    break
+                if char in b" \t\r\n,:":
+                    pos += 1
+                    continue
+
+                frame = self.stack[-1] if self.stack else None
+                if frame is not None and frame.member_start is None and char not in b"]}":
+                    frame.member_start = pos
+
+                if char in b"{[":
+                    path = frame.child_path() if frame else ""
+                    self.stack.append(_JsonFrame(path, pos, char == ord("{")))
+                    expecting_key = char == ord("{")
+                    pos += 1
+                elif char in b"}]":
+                    pos += 1
+                    self._check_size(pos)
+                    closed = self.stack.pop()
+                    if closed.oversized:
+                        self._flush_group(closed)
+                    self._child_closed(closed.start, pos, closed.oversized)
+                    expecting_key = bool(self.stack) and self.stack[-1].is_object
+                elif char == ord('"'):
+                    end = self._string_end(pos) or pos + 1
+                    if expecting_key and frame is not None and frame.is_object:
+                        frame.key = _decode(self._bytes(pos + 1, end - 1))
+                        expecting_key = False
+                    else:
+                        self._child_closed(pos, end)
+                        expecting_key = frame is not None and frame.is_object
+                    pos = end
+                else:
+                    end = self._scalar_end(pos)
+                    self._child_closed(pos, end)
+                    expecting_key = frame is not None and frame.is_object
+                    pos = end
+
+                self._check_size(pos)
+                self._trim(pos)
+                yield from self.chunks
+                self.chunks.clear()
+
+
+def iter_json_chunks(path: Path) -> Iterator[Chunk]:
+    """Largest object paths whose serialized value fits in a chunk"""
+    return iter(_JsonChunker(path))
+
+
+CHUNKERS = {
+    ".md": iter_markdown_chunks,
+    ".markdown": iter_markdown_chunks,
+    ".java": iter_java_chunks,
+    ".json": iter_json_chunks,
+}
+
+
+def iter_chunks(path) -> Iterator[Chunk]:
+    """Stream structure-aware chunks for a document, dispatching on its suffix"""
+    path = Path(path)
+    chunker = CHUNKERS.get(path.suffix.lower(), iter_text_chunks)
+    return chunker(path)
@@ -0,0 +1,424 @@
+"""
+Search index over the team documents in docs/.
+
+Documents are split into passages by doc_chunker and stored in an on-disk BM25 inverted
+index (SQLite): one postings list per term plus a length norm per passage,
+so a query only touches the postings of its own terms.
+
+Passages are also embedded with a local hashing embedding (no model
+download, no network) and kept in the persistent Chroma store in
+team_chroma.db for nearest-neighbour search. chromadb is optional; without
+it only lexical search is available.
+
+A manifest of (path, mtime, size, content hash) per indexed file lets
+sync_index re-chunk and re-embed only new or changed files and drop the
+passages of removed ones, so re-indexing cost follows the size of the
+change rather than the size of the corpus.
+"""
+
+import hashlib
+import heapq
+import logging
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterator, List
+
+import doc_chunker
+
+try:
+    import chromadb
+    from chromadb.config import Settings
+except ImportError:
+    chromadb = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DOCS_DIR = BASE_DIR / "docs"
+INDEX_PATH = BASE_DIR / "team_index.db"
+CHROMA_PATH = BASE_DIR / "team_chroma.db"
+CHROMA_COLLECTION = "team_docs"
+EMBEDDING_DIM = 2048
+
+INDEXED_SUFFIXES = {".md", ".txt", ".java", ".json"}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "the", "this", "to", "was",
+    "we", "what", "when", "where", "which", "who", "whos", "why", "with", "you", "your",
+}
+
+# Bump when the schema, chunking or embedding changes; older index files are rebuilt
+SCHEMA_VERSION = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings(chunk_id);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def file_sha256(path: Path) -> str:
+    """Content hash of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Local feature-hashing embedding of word unigrams and bigrams, L2-normalized"""
+    tokens = tokenize(text)
+    features = Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+    vector = [0.0] * dim
+    for feature, count in features.items():
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign * (1 + math.log(count))
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm:
+        vector = [v / norm for v in vector]
+    return vector
+
+
+class BM25Index:
+    """On-disk BM25 inverted index with per-passage length norms"""
+
+    def __init__(self, path=INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        self.path = str(path)
+        self.k1 = k1
+        self.b = b
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in ("chunks", "postings", "terms", "stats", "manifest"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite connections cannot be shared across Streamlit session threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _add_stat(self, conn, key: str, delta: float):
+        conn.execute(
+            "INSERT INTO stats(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (key, delta),
+        )
+
+    def add_passages(self, rel_path: str, chunks) -> List[dict]:
+        """Index a document's doc_chunker chunks in place of any already stored for it; returns the stored passages"""
+        added = []
+        with self._write_lock, self._connect() as conn:
+            # In the same transaction, so re-adding a path after an interrupted sync never duplicates it
+            self._remove_chunks(conn, rel_path)
+            for title, text, start, end in chunks:
+                counts = Counter(tokenize(f"{title} {text}"))
+                length = sum(counts.values())
+                if not length:
+                    continue
+                chunk_id = conn.execute(
+                    "INSERT INTO chunks(path, title, text, start, end, length) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rel_path, title, text, start, end, length),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO postings(term, chunk_id, tf) VALUES (?, ?, ?)",
+                    ((term, chunk_id, tf) for term, tf in counts.items()),
+                )
+                conn.executemany(
+                    "INSERT INTO terms(term, df) VALUES (?, 1) "
+                    "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    ((term,) for term in counts),
+                )
+                self._add_stat(conn, "chunk_count", 1)
+                self._add_stat(conn, "total_length", length)
+                added.append({
+                    "id": chunk_id, "path": rel_path, "title": title, "text": text, "start": start, "end": end,
+                })
+        return added
+
+    def _remove_chunks(self, conn, rel_path: str):
+        rows = conn.execute("SELECT id, length FROM chunks WHERE path = ?", (rel_path,)).fetchall()
+        for chunk_id, length in rows:
+            terms = conn.execute("SELECT term FROM postings WHERE chunk_id = ?", (chunk_id,)).fetchall()
+            conn.executemany("UPDATE terms SET df = df - 1 WHERE term = ?", terms)
+            conn.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+            self._add_stat(conn, "chunk_count", -1)
+            self._add_stat(conn, "total_length", -length)
+        conn.execute("DELETE FROM terms WHERE df <= 0")
+        conn.execute("DELETE FROM chunks WHERE path = ?", (rel_path,))
+
+    def remove_path(self, rel_path: str):
+        """Drop every passage and posting belonging to a document"""
+        with self._write_lock, self._connect() as conn:
+            self._remove_chunks(conn, rel_path)
+            conn.execute("DELETE FROM manifest WHERE path = ?", (rel_path,))
+
+    def clear(self):
+        with self._write_lock, self._connect() as conn:
+            for table in ("chunks", "postings", "terms", "stats", "manifest"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def manifest(self) -> dict:
+        """Map of indexed path -> (mtime, size, sha256)"""
+        rows = self._connect().execute("SELECT path, mtime, size, sha256 FROM manifest").fetchall()
+        return {path: (mtime, size, sha256) for path, mtime, size, sha256 in rows}
+
+    def record_file(self, rel_path: str, mtime: float, size: int, sha256: str):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO manifest(path, mtime, size, sha256) VALUES (?, ?, ?, ?)",
+                (rel_path, mtime, size, sha256),
+            )
+
+    def chunk_count(self) -> int:
+        row = self._connect().execute("SELECT value FROM stats WHERE key = 'chunk_count'").fetchone()
+        return int(row[0]) if row else 0
+
+    def search(self, query: str, k: int = 5) -> List[dict]:
+        """Return the top-k passages for a query ranked by BM25 score"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        conn = self._connect()
+        stats = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+        n_chunks = stats.get("chunk_count", 0)
+        if n_chunks <= 0:
+            return []
+        avg_length = stats.get("total_length", 0) / n_chunks
+
+        scores = Counter()
+        for term in terms:
+            row = conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+            if not row:
+                continue
+            df = row[0]
+            idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+            postings = conn.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                "WHERE p.term = ?",
+                (term,),
+            )
+            for chunk_id, tf, length in postings:
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        results = []
+        for chunk_id, score in top:
+            path, title, text, start, end = conn.execute(
+                "SELECT path, title, text, start, end FROM chunks WHERE id = ?", (chunk_id,)
+            ).fetchone()
+            results.append({
+                "id": chunk_id, "path": path, "title": title, "text": text, "start": start, "end": end, "score": score,
+            })
+        return results
+
+
+class VectorStore:
+    """Persistent Chroma collection of locally embedded passages"""
+
+    def __init__(self, path=CHROMA_PATH, collection: str = CHROMA_COLLECTION):
+        if chromadb is None:
+            raise RuntimeError("chromadb is not installed")
+        self.client = chromadb.PersistentClient(
+            path=str(path), settings=Settings(anonymized_telemetry=False)
+        )
+        self.name = collection
+        self.collection = self._open_collection()
+        if (self.collection.metadata or {}).get("schema_version") != SCHEMA_VERSION:
+            self.clear()
+
+    def _open_collection(self):
+        return self.client.get_or_create_collection(
+            self.name, metadata={"hnsw:space": "cosine", "schema_version": SCHEMA_VERSION},
+            embedding_function=None,
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add_passages(self, passages: List[dict]):
+        """Embed and store passages, keyed by their BM25 chunk id"""
+        if not passages:
+            return
+        self.collection.upsert(
+            ids=[str(p["id"]) for p in passages],
+            embeddings=[embed(f"{p['title']} {p['text']}") for p in passages],
+            documents=[p["text"] for p in passages],
+            metadatas=[
+                {"path": p["path"], "title": p["title"], "start": p["start"], "end": p["end"]} for p in passages
+            ],
+        )
+
+    def remove_path(self, rel_path: str):
+        self.collection.delete(where={"path": rel_path})
+
+    def clear(self):
+        # Recreate rather than delete ids so a new embedding dimension is accepted
+        self.client.delete_collection(self.name)
+        self.collection = self._open_collection()
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[dict]:
+        """Return up to k nearest passages whose cosine similarity exceeds min_score"""
+        if not tokenize(query) or self.count() == 0:
+            return []
+        result = self.collection.query(
+            query_embeddings=[embed(query)],
+            n_results=min(k, self.count()),
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            {
+                "id": int(chunk_id), "path": meta["path"], "title": meta["title"], "text": text,
+                "start": meta.get("start"), "end": meta.get("end"), "score": 1 - distance,
+            }
+            for chunk_id, text, meta, distance in zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]
+            )
+            if 1 - distance > min_score
+        ]
+
+
+def open_vector_store():
+    """Open the persistent vector store, or None when chromadb is unavailable"""
+    if chromadb is None:
+        return None
+    try:
+        return VectorStore()
+    except Exception as e:
+        logger.error(f"Failed to open vector store at {CHROMA_PATH}: {e}")
+        return None
+
+
+def iter_doc_files(docs_dir=DOCS_DIR) -> Iterator[Path]:
+    for path in sorted(Path(docs_dir).rglob("*")):
+        if path.is_file() and path.suffix.lower() in INDEXED_SUFFIXES:
+            yield path
+
+
+def sync_index(docs_dir=DOCS_DIR, index_path=INDEX_PATH, vector_store=None) -> dict:
+    """Bring the indexes in line with docs/, touching only new, changed or removed files"""
+    docs_dir = Path(docs_dir)
+    index = BM25Index(index_path)
+    # Stores that drifted apart (one lost its data or was rebuilt) cannot be patched incrementally
+    if vector_store is not None:
+        if vector_store.count() == 0 and index.chunk_count() > 0:
+            index.clear()
+        elif index.chunk_count() == 0 and vector_store.count() > 0:
+            vector_store.clear()
+
+    manifest = index.manifest()
+    summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    seen = set()
+    for path in iter_doc_files(docs_dir):
+        rel_path = path.relative_to(docs_dir).as_posix()
+        seen.add(rel_path)
+        stat = path.stat()
+        previous = manifest.get(rel_path)
+        if previous and previous[:2] == (stat.st_mtime, stat.st_size):
+            summary["unchanged"] += 1
+            continue
+
+        sha256 = file_sha256(path)
+        if previous and previous[2] == sha256:
+            # Rewritten with identical content (e.g. create_sample_docs.py), just refresh the stat
+            index.record_file(rel_path, stat.st_mtime, stat.st_size, sha256)
+            summary["unchanged"] += 1
+            continue
+
+        # Passages are replaced by path even without a manifest entry, and the file is recorded only
+        # once both stores hold it, so a sync that dies midway is redone cleanly by the next one
+        if vector_store is not None:
+            vector_store.remove_path(rel_path)
+        added = index.add_passages(rel_path, doc_chunker.iter_chunks(path))
+        if vector_store is not None:
+            vector_store.add_passages(added)
+        index.record_file(rel_path, stat.st_mtime, stat.st_size, sha256)
+        summary["updated" if previous else "added"] += 1
+        logger.info(f"Indexed {rel_path} ({len(added)} passages)")
+
+    for rel_path in set(manifest) - seen:
+        index.remove_path(rel_path)
+        if vector_store is not None:
+            vector_store.remove_path(rel_path)
+        summary["removed"] += 1
+        logger.info(f"Removed {rel_path} from the index")
+
+    return summary
+
+
+def build_index(docs_dir=DOCS_DIR, index_path=INDEX_PATH, vector_store=None) -> BM25Index:
+    """Rebuild the BM25 index (and vector store, if given) from scratch over docs/"""
+    index = BM25Index(index_path)
+    index.clear()
+    if vector_store is not None:
+        vector_store.clear()
+    sync_index(docs_dir, index_path, vector_store)
+    return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    vector_store = open_vector_store()
+    if "--rebuild" in sys.argv:
+        build_index(vector_store=vector_store)
+    else:
+        summary = sync_index(vector_store=vector_store)
+        print(f"🔄 {summary['added']} added, {summary['updated']} updated, "
+              f"{summary['removed']} removed, {summary['unchanged']} unchanged")
+    index = BM25Index()
+    print(f"📚 {index.chunk_count()} passages indexed in {INDEX_PATH}")
+    if vector_store is not None:
+        print(f"🧭 {vector_store.count()} embeddings stored in {CHROMA_PATH}")
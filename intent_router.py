@@ -0,0 +1,61 @@
+"""
+Multi-pattern phrase matcher used to route chatbot questions to intents.
+
+All intent phrases are compiled into a single Aho-Corasick automaton, so a
+question is scanned once no matter how many intents or phrases exist.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton mapping substring phrases to intent names"""
+
+    def __init__(self, intents: Iterable[Tuple[str, List[str]]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for intent, phrases in intents:
+            for phrase in phrases:
+                self._add(phrase.lower(), intent)
+        self._build_failure_links()
+
+    def _add(self, phrase: str, intent: str):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(intent)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit matches that end at the fallback state (suffix phrases)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def match(self, text: str) -> Set[str]:
+        """Return every intent with at least one phrase occurring in text"""
+        matched = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                matched |= self._output[state]
+        return matched
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load generator for team_chatbot.py.
+
+Drives N simulated sessions with Streamlit's AppTest harness, each in its own
+worker process: AppTest installs a process-wide runtime for every run and
+removes it afterwards, so runs cannot overlap within one process. In-process
+caches (st.cache_resource, st.cache_data) are therefore per session here,
+while the SQLite answer cache and the document index are shared as usual.
+Each session logs in as one of the USERS accounts in turn, then follows a
+randomized schedule: after an exponentially distributed think time it either
+reruns the page (the dashboard view; switching tabs happens in the browser
+and never reaches the server, so a rerun is the server-side cost of looking
+around) or submits a chat question. The run is repeated for each session
+count, and the report gives rerun latency percentiles, throughput and the
+resident memory each session adds on top of the imported app, so you can see
+where latency starts to climb.
+
+    python load_test.py --sessions 1,5,10,25 --duration 30
+    python load_test.py --sessions 10 --mock --mock-latency lognormal:600:0.4
+
+Without --mock the chat runs in demo mode. ANTHROPIC_API_KEY is ignored
+unless --live is given, so a load test never reaches the real API by accident.
+The simulated chat turns are not written to the app's request log unless
+--request-log names a file for them.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+BASE_DIR = Path(__file__).parent
+APP_PATH = BASE_DIR / "team_chatbot.py"
+PASSWORD = "optum123"
+
+QUESTIONS = [
+    "who's on call",
+    "tell me the burndown",
+    "what are the sprint goals",
+    "what is our tech stack",
+    "how is the kafka migration going",
+    "who is on the taj mahal team",
+    "who is on the machu picchu team",
+    "what am I working on",
+    "how do I deploy to production",
+    "the app won't start locally",
+    "what's the budget status",
+    "how is team health",
+    "who is bob",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SimulatedSession:
+    """One browser session: an AppTest instance plus its own schedule and timings"""
+
+    def __init__(self, username: str, rng: random.Random, timeout: float):
+        self.username = username
+        self.rng = rng
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.timings = {"login": [], "rerun": [], "chat": []}
+        self.errors = 0
+
+    def _timed(self, action: str, step):
+        started = time.perf_counter()
+        try:
+            step()
+            if self.app.exception:
+                raise RuntimeError(self.app.exception[0].message)
+        except Exception:
+            self.errors += 1
+            return
+        self.timings[action].append((time.perf_counter() - started) * 1000)
+
+    def login(self):
+        self.app.run()
+
+        def submit():
+            self.app.text_input[0].input(self.username)
+            self.app.text_input[1].input(PASSWORD)
+            self.app.button[0].click().run()
+
+        self._timed("login", submit)
+
+    def act(self, chat_ratio: float):
+        if self.rng.random() < chat_ratio:
+            question = self.rng.choice(QUESTIONS)
+            self._timed("chat", lambda: self.app.chat_input[0].set_value(question).run())
+        else:
+            self._timed("rerun", self.app.run)
+
+    def run_schedule(self, stop_at: float, think_time: float, chat_ratio: float):
+        while time.monotonic() < stop_at:
+            time.sleep(self.rng.expovariate(1 / think_time) if think_time else 0)
+            if time.monotonic() >= stop_at:
+                break
+            self.act(chat_ratio)
+
+
+def run_session(username: str, seed: int, args, barrier, results):
+    """Worker process: log in, wait for every other session, then follow the schedule"""
+    sys.path.insert(0, str(BASE_DIR))
+    import team_chatbot  # noqa: F401  imported up front so its cost is not counted per session
+
+    memory_before = rss_mb()
+    session = SimulatedSession(username, random.Random(seed), args.timeout)
+    session.login()
+    memory = rss_mb() - memory_before
+    barrier.wait()
+    session.run_schedule(time.monotonic() + args.duration, args.think_time, args.chat_ratio)
+    results.put((session.timings, session.errors, memory))
+
+
+def run_level(count: int, args, usernames: list) -> dict:
+    """Run `count` concurrent sessions for args.duration seconds and summarize"""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(count + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(target=run_session, args=(usernames[i % len(usernames)], args.seed + i, args, barrier, results))
+        for i in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    # Scheduled activity starts once every session has logged in (two runs each)
+    barrier.wait(timeout=2 * args.timeout)
+    started = time.monotonic()
+    # The last action may start just before the schedule ends
+    outcomes = [results.get(timeout=args.duration + args.timeout) for _ in workers]
+    elapsed = time.monotonic() - started
+    for worker in workers:
+        worker.join()
+
+    reruns = [t for timings, _, _ in outcomes for t in timings["rerun"]]
+    chats = [t for timings, _, _ in outcomes for t in timings["chat"]]
+    logins = [t for timings, _, _ in outcomes for t in timings["login"]]
+    everything = reruns + chats
+    return {
+        "sessions": count,
+        "requests": len(everything),
+        "throughput_rps": len(everything) / elapsed if elapsed else 0.0,
+        "rerun_p50_ms": percentile(reruns, 50),
+        "rerun_p95_ms": percentile(reruns, 95),
+        "rerun_p99_ms": percentile(reruns, 99),
+        "chat_p50_ms": percentile(chats, 50),
+        "chat_p95_ms": percentile(chats, 95),
+        "login_p50_ms": statistics.median(logins) if logins else 0.0,
+        "memory_per_session_mb": statistics.mean(memory for _, _, memory in outcomes),
+        "errors": sum(errors for _, errors, _ in outcomes),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,5,10", help="comma-separated session counts to step through")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of scheduled activity per level")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between a session's actions")
+    parser.add_argument("--chat-ratio", type=float, default=0.3, help="fraction of actions that ask a question")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest per-run timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mock", action="store_true", help="answer chat through the local mock Messages API")
+    parser.add_argument("--mock-latency", default="lognormal:400:0.4", help="mock time-to-first-token spec (ms)")
+    parser.add_argument("--live", action="store_true", help="allow ANTHROPIC_API_KEY to reach the real API")
+    parser.add_argument("--request-log", type=Path, help="write the simulated chat turns to this request log")
+    args = parser.parse_args()
+
+    # Simulated turns never land in the app's real request log
+    if args.request_log:
+        os.environ["LOYALTYAI_REQUEST_LOG"] = "true"
+        os.environ["LOYALTYAI_REQUEST_LOG_PATH"] = str(args.request_log)
+    else:
+        os.environ["LOYALTYAI_REQUEST_LOG"] = "false"
+
+    if args.mock:
+        from mock_anthropic_server import MockSettings, start_server
+
+        _, base_url = start_server(MockSettings(latency=args.mock_latency, seed=args.seed))
+        os.environ["LOYALTYAI_AI_BASE_URL"] = base_url
+        os.environ["ANTHROPIC_API_KEY"] = "mock"
+        print(f"🧪 Mock Messages API at {base_url}")
+    elif not args.live:
+        os.environ.pop("ANTHROPIC_API_KEY", None)
+
+    # Session processes inherit the environment settled above
+    sys.path.insert(0, str(BASE_DIR))
+    import team_chatbot
+
+    usernames = list(team_chatbot.USERS)
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    print(f"{'sessions':>8} {'req/s':>7} {'rerun p50':>10} {'p95':>8} {'p99':>8} {'chat p50':>9} {'p95':>8} {'MB/sess':>8} {'errors':>6}")
+    for count in levels:
+        r = run_level(count, args, usernames)
+        print(
+            f"{r['sessions']:>8} {r['throughput_rps']:>7.1f} {r['rerun_p50_ms']:>10.0f} {r['rerun_p95_ms']:>8.0f} "
+            f"{r['rerun_p99_ms']:>8.0f} {r['chat_p50_ms']:>9.0f} {r['chat_p95_ms']:>8.0f} "
+            f"{r['memory_per_session_mb']:>8.1f} {r['errors']:>6}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API, for offline load and latency testing.
+
+Serves POST /v1/messages, both blocking and streamed (server-sent events), with
+a configurable time-to-first-token distribution, token streaming rate, injected
+server errors and 429 rate limiting. The prompt cache is simulated as well: a
+repeated cache_control prefix is reported as cache_read_input_tokens, once it
+reaches the model's minimum cacheable length. Runs are
+reproducible for a given --seed.
+
+Point the chatbot at it with:
+    python mock_anthropic_server.py --port 8765 --latency lognormal:400:0.5
+    LOYALTYAI_AI_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=mock streamlit run team_chatbot.py
+
+Latency specs (milliseconds): fixed:MS, uniform:LOW:HIGH, normal:MEAN:STD,
+lognormal:MEDIAN:SIGMA, exponential:MEAN.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_estimate import estimate_tokens
+from usage_ledger import prompt_cache_min_tokens
+
+FILLER_WORDS = (
+    "the loyalty platform team is tracking this item in the current sprint and will "
+    "share an update at the next standup with details from the team dashboard"
+).split()
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a function returning a delay in seconds"""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    samplers = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "normal": lambda rng: rng.gauss(values[0], values[1]),
+        "lognormal": lambda rng: values[0] * math.exp(rng.gauss(0, values[1])),
+        "exponential": lambda rng: rng.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'")
+    return lambda rng: max(0.0, samplers[kind](rng)) / 1000
+
+
+class MockSettings:
+    """Behaviour knobs for the mock server"""
+
+    def __init__(
+        self,
+        latency: str = "fixed:200",
+        tokens_per_second: float = 80,
+        output_tokens: int = 120,
+        error_rate: float = 0.0,
+        error_status: int = 529,
+        rate_limit_rps: float = 0,
+        rate_limit_burst: int = 10,
+        seed: int = None,
+    ):
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rps = rate_limit_rps
+        self.rate_limit_burst = rate_limit_burst
+        self.seed = seed
+
+
+class MockState:
+    """Shared server state: random source, token bucket, cached prefixes and counters"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.tokens = float(settings.rate_limit_burst)
+        self.refilled_at = time.monotonic()
+        self.cached_prefixes = set()
+        self.counts = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+
+    def draw(self):
+        """(first-token delay, inject error?) for one request, under the lock for reproducibility"""
+        with self.lock:
+            delay = self.settings.latency(self.rng)
+            fail = self.rng.random() < self.settings.error_rate
+        return delay, fail
+
+    def take_rate_token(self) -> bool:
+        if not self.settings.rate_limit_rps:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.settings.rate_limit_burst,
+                self.tokens + (now - self.refilled_at) * self.settings.rate_limit_rps,
+            )
+            self.refilled_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def prompt_usage(self, body: dict) -> dict:
+        """Input token usage, splitting out the cacheable prefix like the real prompt cache"""
+        system = body.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        messages_text = json.dumps(body.get("messages", []))
+        usage = {"input_tokens": estimate_tokens(messages_text), "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        min_tokens = prompt_cache_min_tokens(body.get("model"))
+        prefix = hashlib.sha256()
+        prefix_tokens = pending = 0
+        for block in system:
+            text = block.get("text", "")
+            prefix.update(text.encode("utf-8"))
+            prefix_tokens += estimate_tokens(text)
+            pending += estimate_tokens(text)
+            # Like the real cache, a breakpoint on a prefix under the minimum length caches nothing
+            if block.get("cache_control") and prefix_tokens >= min_tokens:
+                key = prefix.hexdigest()
+                with self.lock:
+                    hit = key in self.cached_prefixes
+                    self.cached_prefixes.add(key)
+                usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] += pending
+                pending = 0
+        usage["input_tokens"] += pending
+        return usage
+
+
+def answer_words(body: dict, count: int) -> list:
+    """Deterministic answer text: echo the question, then pad with filler words"""
+    question = ""
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            question = content
+        elif isinstance(content, list):
+            question = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    words = ["Mock", "answer:"] + question.split()[:20]
+    while len(words) < count:
+        words.extend(FILLER_WORDS)
+    return words[:count]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY each response stalls on delayed ACKs
+    disable_nagle_algorithm = True
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, error_type: str, message: str, headers: dict = None):
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def _send_event(self, event: str, data: dict):
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.state.lock:
+                counts = dict(self.state.counts)
+            self._send_json(200, counts)
+        else:
+            self._send_error(404, "not_found_error", f"No route for GET {self.path}")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        if self.path.split("?")[0] != "/v1/messages":
+            self._send_error(404, "not_found_error", f"No route for POST {self.path}")
+            return
+
+        state = self.state
+        state.count("requests")
+        if not state.take_rate_token():
+            state.count("rate_limited")
+            retry_after = max(1, math.ceil(1 / state.settings.rate_limit_rps))
+            self._send_error(429, "rate_limit_error", "Mock rate limit exceeded", {"retry-after": str(retry_after)})
+            return
+
+        delay, fail = state.draw()
+        time.sleep(delay)
+        if fail:
+            state.count("errors")
+            error_type = "overloaded_error" if state.settings.error_status == 529 else "api_error"
+            self._send_error(state.settings.error_status, error_type, "Injected mock failure")
+            return
+
+        count = min(body.get("max_tokens", state.settings.output_tokens), state.settings.output_tokens)
+        words = answer_words(body, count)
+        usage = state.prompt_usage(body)
+        message = {
+            "id": f"msg_mock_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": dict(usage, output_tokens=0),
+        }
+
+        if not body.get("stream"):
+            time.sleep(len(words) / state.settings.tokens_per_second)
+            message["content"] = [{"type": "text", "text": " ".join(words)}]
+            message["stop_reason"] = "end_turn"
+            message["usage"]["output_tokens"] = len(words)
+            self._send_json(200, message)
+            return
+
+        state.count("streamed")
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        try:
+            self._send_event("message_start", {"type": "message_start", "message": message})
+            self._send_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+            interval = 1 / state.settings.tokens_per_second
+            for i, word in enumerate(words):
+                time.sleep(interval)
+                text = word if i == 0 else f" {word}"
+                self._send_event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}})
+            self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            self._send_event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(words)}})
+            self._send_event("message_stop", {"type": "message_stop"})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up mid-stream (timeout, hedge loser or closed browser tab)
+            pass
+
+
+def make_server(settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(settings or MockSettings())})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0):
+    """Start the mock server on a background thread; returns (server, base_url)"""
+    server = make_server(settings, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-anthropic", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:200", help="time-to-first-token distribution (ms)")
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--output-tokens", type=int, default=120, help="answer length, capped by max_tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=529)
+    parser.add_argument("--rate-limit-rps", type=float, default=0, help="token-bucket refill rate; 0 disables 429s")
+    parser.add_argument("--rate-limit-burst", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_rps=args.rate_limit_rps,
+        rate_limit_burst=args.rate_limit_burst,
+        seed=args.seed,
+    )
+    server = make_server(settings, args.host, args.port)
+    print(f"🧪 Mock Messages API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
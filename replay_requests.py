@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Replay a request log through the chatbot pipeline.
+
+Reads the chat turns team_chatbot.py appends to requests.jsonl and asks each
+question again, through get_relevant_context and then the same answer path
+the app uses, as the account whose role and team match the original asker.
+Turns are released on the original schedule, compressed by --speed, and never
+wait for earlier turns to finish, so bursts overlap as they did in production.
+--speed 0 sends every turn back to back.
+
+    python replay_requests.py                          # original pace, demo mode
+    python replay_requests.py --speed 10 --mock        # 10x faster against the mock API
+    python replay_requests.py other.jsonl --speed 0 --limit 200
+
+The report gives latency percentiles per answer source (answer cache, model,
+coalesced or demo) and how far behind schedule turns were released. Without
+--mock ANTHROPIC_API_KEY is ignored unless --live is given, as in load_test.py.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from request_log import LOG_PATH, read_records
+
+BASE_DIR = Path(__file__).parent
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def record_offsets(records: list) -> list:
+    """Seconds from the first turn for each record; records without a usable timestamp follow the previous one"""
+    offsets = []
+    first = previous = None
+    for record in records:
+        try:
+            ts = datetime.fromisoformat(record["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            ts = previous
+        if ts is not None and first is None:
+            first = ts
+        offsets.append(0.0 if ts is None else max(0.0, ts - first))
+        previous = ts
+    return offsets
+
+
+def find_user(users: dict, record: dict) -> dict:
+    """The test account closest to the original asker: same role and team, else same dashboard"""
+    for user in users.values():
+        if user["role"] == record.get("role") and user["team"] == record.get("team"):
+            return user
+    for user in users.values():
+        if user["dashboard_type"] == record.get("dashboard_type"):
+            return user
+    return next(iter(users.values()))
+
+
+class Replayer:
+    """Drives recorded turns through team_chatbot and collects timings"""
+
+    def __init__(self, team_chatbot, client, stream: bool):
+        self.app = team_chatbot
+        self.client = client
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.lags = []
+        self.errors = 0
+
+    def ask(self, record: dict, scheduled_at: float):
+        lag = time.monotonic() - scheduled_at
+        user = find_user(self.app.USERS, record)
+        question = record["question"]
+        trace = {}
+        started = time.perf_counter()
+        try:
+            context = self.app.get_relevant_context(question, user, trace)
+            if self.stream:
+                for _ in self.app.stream_answer_with_ai(question, context, self.client, user, trace):
+                    pass
+            else:
+                self.app.generate_answer_with_ai(question, context, self.client, user, trace)
+        except Exception as e:
+            trace["error"] = type(e).__name__
+        latency = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.lags.append(lag * 1000)
+            if trace.get("error"):
+                self.errors += 1
+            self.latencies[trace.get("cache", "unknown")].append(latency)
+            self.latencies["all"].append(latency)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", type=Path, default=LOG_PATH, help="request log to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier; 0 sends turns back to back")
+    parser.add_argument("--limit", type=int, help="replay at most this many turns")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="turns answered concurrently")
+    parser.add_argument("--stream", action="store_true", help="use the streaming answer path")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always reach the model path")
+    parser.add_argument("--mock", action="store_true", help="answer through the local mock Messages API")
+    parser.add_argument("--mock-latency", default="lognormal:400:0.4", help="mock time-to-first-token spec (ms)")
+    parser.add_argument("--live", action="store_true", help="allow ANTHROPIC_API_KEY to reach the real API")
+    args = parser.parse_args()
+
+    records = list(read_records(args.log))[: args.limit]
+    if not records:
+        print(f"ℹ️  No chat turns in {args.log}")
+        return 0
+
+    # Replayed turns must not be logged again
+    os.environ["LOYALTYAI_REQUEST_LOG"] = "false"
+    if args.no_answer_cache:
+        os.environ["LOYALTYAI_ANSWER_CACHE"] = "false"
+    if args.mock:
+        from mock_anthropic_server import MockSettings, start_server
+
+        _, base_url = start_server(MockSettings(latency=args.mock_latency))
+        os.environ["LOYALTYAI_AI_BASE_URL"] = base_url
+        os.environ["ANTHROPIC_API_KEY"] = "mock"
+        print(f"🧪 Mock Messages API at {base_url}")
+    elif not args.live:
+        os.environ.pop("ANTHROPIC_API_KEY", None)
+
+    # Imported after the environment is settled
+    sys.path.insert(0, str(BASE_DIR))
+    import team_chatbot
+
+    replayer = Replayer(team_chatbot, team_chatbot.initialize_ai_client(), args.stream)
+    offsets = record_offsets(records)
+    span = offsets[-1] / args.speed if args.speed else 0
+    print(f"🔁 Replaying {len(records)} turns from {args.log} over ~{span:.1f}s")
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+        for record, offset in zip(records, offsets):
+            scheduled_at = started + (offset / args.speed if args.speed else 0)
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(replayer.ask, record, scheduled_at)
+    elapsed = time.monotonic() - started
+
+    print(f"{'source':>10} {'turns':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for source, samples in sorted(replayer.latencies.items(), key=lambda item: item[0] != "all"):
+        print(f"{source:>10} {len(samples):>6} {percentile(samples, 50):>9.1f} {percentile(samples, 95):>9.1f} {percentile(samples, 99):>9.1f}")
+    print(
+        f"⏱️  {len(records) / elapsed:.1f} turns/s, release lag p95 {percentile(replayer.lags, 95):.1f} ms, "
+        f"{replayer.errors} errors"
+    )
+    return 1 if replayer.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Structured request log: one JSON object per chat turn, appended to a JSONL file.
+
+Writers never touch the file. append() puts the record on a bounded queue and
+returns at once; a background thread drains the queue in batches and flushes
+every flush_interval seconds. When the queue is full, records are dropped
+and counted rather than slowing the chat down.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+LOG_PATH = BASE_DIR / "requests.jsonl"
+
+
+class RequestLog:
+    """Buffered, non-blocking JSONL appender"""
+
+    def __init__(self, path=LOG_PATH, flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.dropped = 0
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._write_forever, name="request-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def append(self, record: dict):
+        """Queue one record for writing; never blocks"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> list:
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _write(self, records: list):
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record, default=str) + "\n")
+            except (TypeError, ValueError) as e:
+                logger.error(f"Skipping unserializable request log record: {e}")
+        if not lines:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.written += len(lines)
+        except OSError as e:
+            self.dropped += len(lines)
+            logger.error(f"Failed to write request log {self.path}: {e}")
+
+    def _write_forever(self):
+        while not self._closed.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Let a burst accumulate so it goes out in one write
+            self._closed.wait(self.flush_interval)
+            self._write([first] + self._drain())
+
+    def close(self):
+        """Stop the writer and flush whatever is still queued"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._writer.join(timeout=self.flush_interval + 1)
+        self._write(self._drain())
+
+    def stats(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+
+def read_records(path) -> Iterator[dict]:
+    """Chat turn records from a request log, skipping blank, malformed and non-turn lines"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line {line_number} of {path}")
+                continue
+            if isinstance(record, dict) and record.get("question"):
+                yield record
@@ -1,15 +1,165 @@
 import streamlit as st
 import os
 import hashlib
-import anthropic
+import inspect
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List
 
+import doc_index
+from ai_client import AIClient, CircuitOpenError, SingleFlight
+from answer_cache import AnswerCache, make_cache_key, normalize_question, question_shingles
+from conversation_memory import compaction_split, conversation_digest, extractive_summary, is_follow_up, recent_turns, transcript
+from data_store import DATA_DIR as DEFAULT_DATA_DIR, DataStore, SectionDirectory, SectionView
+from intent_router import PhraseMatcher
+from metrics import REGISTRY, start_file_exporter, start_http_exporter
+from request_log import LOG_PATH, RequestLog
+from token_estimate import estimate_tokens
+from usage_ledger import UsageLedger, prompt_cache_min_tokens
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Retrieval settings: candidates per retriever, RRF damping constant and context token budget
+DOC_SEARCH_TOP_K = int(os.getenv("LOYALTYAI_DOC_TOP_K", "8"))
+RRF_K = int(os.getenv("LOYALTYAI_RRF_K", "60"))
+VECTOR_MIN_SIMILARITY = float(os.getenv("LOYALTYAI_VECTOR_MIN_SIMILARITY", "0.1"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LOYALTYAI_CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Model request parameters shared by blocking and streaming calls
+MODEL_PARAMS = {
+    "model": "claude-3-5-haiku-20241022",
+    "max_tokens": 800,
+    # Lower temperature to reduce hallucination; sent in the request body because newer SDK
+    # releases no longer take temperature as a keyword argument
+    "extra_body": {"temperature": 0.1},
+}
+STREAM_RESPONSES = os.getenv("LOYALTYAI_STREAM_RESPONSES", "true").lower() == "true"
+# Yielded by a stream that failed midway: the text shown so far is to be discarded
+STREAM_RESET = object()
+
+# Chat history rendering: messages shown on each rerun, and how many more "load earlier" reveals
+CHAT_HISTORY_WINDOW = int(os.getenv("LOYALTYAI_CHAT_HISTORY_WINDOW", "20"))
+CHAT_HISTORY_PAGE = int(os.getenv("LOYALTYAI_CHAT_HISTORY_PAGE", "20"))
+
+# Seconds between dashboard tab refreshes, which rerun only the dashboard fragment; 0 disables
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("LOYALTYAI_DASHBOARD_REFRESH_SECONDS", "60"))
+
+# Conversation memory: messages kept verbatim per session before the oldest are folded into a
+# rolling summary, the summary's token cap, and the recent turns sent with follow-up questions
+CONVERSATION_MAX_MESSAGES = int(os.getenv("LOYALTYAI_CONVERSATION_MAX_MESSAGES", "40"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("LOYALTYAI_CONVERSATION_SUMMARY_TOKENS", "300"))
+CONVERSATION_CONTEXT_TURNS = int(os.getenv("LOYALTYAI_CONVERSATION_CONTEXT_TURNS", "3"))
+CONVERSATION_CONTEXT_TOKENS = int(os.getenv("LOYALTYAI_CONVERSATION_CONTEXT_TOKENS", "600"))
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a conversation between a team member and LoyaltyAI, an internal team assistant.
+
+Merge the earlier summary and the new turns into one short summary of at most a few sentences. Keep names, numbers, decisions and open questions; drop greetings and repetition. Reply with the summary only."""
+
+# Cheaper, shorter-output profile used for a dashboard type once it exceeds its cost budget
+ECONOMY_MODEL_PARAMS = {
+    "model": os.getenv("LOYALTYAI_ECONOMY_MODEL", "claude-3-haiku-20240307"),
+    "max_tokens": int(os.getenv("LOYALTYAI_ECONOMY_MAX_TOKENS", "300")),
+    "extra_body": {"temperature": 0.1},
+}
+
+# Model spend budgets in USD per rolling window, by dashboard type; only enforced when
+# LOYALTYAI_COST_BUDGETS is true, and dashboard types without a budget are never switched
+COST_BUDGETS_ENABLED = os.getenv("LOYALTYAI_COST_BUDGETS", "false").lower() == "true"
+COST_BUDGET_WINDOW_SECONDS = float(os.getenv("LOYALTYAI_COST_BUDGET_WINDOW", "3600"))
+COST_BUDGETS = {
+    "director": 2.00,
+    "engineering_manager": 2.00,
+    "senior_engineer": 1.50,
+    "product_manager": 1.00,
+    "scrum_master": 1.00,
+    "individual": 3.00,
+}
+
+# Static system instructions; sent first so every request shares the prefix
+SYSTEM_INSTRUCTIONS = """You are LoyaltyAI, an internal team assistant for the Optum Loyalty platform.
+
+IMPORTANT: This is a demonstration application with fictional team data. You must ONLY use information provided in the context below. DO NOT make up or invent any names, people, projects, or details that are not explicitly mentioned in the context.
+
+If someone asks about a person or information not in the context, clearly state that you don't have that information in your database and suggest they might be thinking of someone else from the known team members."""
+
+# Input-token budget for the per-question part of the model prompt (everything after the
+# cached team reference), by dashboard type
+DEFAULT_INPUT_TOKEN_BUDGET = int(os.getenv("LOYALTYAI_INPUT_TOKEN_BUDGET", "1800"))
+INPUT_TOKEN_BUDGETS = {
+    "director": 2500,
+    "engineering_manager": 2500,
+    "senior_engineer": 2200,
+    "product_manager": 1800,
+    "scrum_master": 1800,
+    "individual": 1800,
+}
+
+# Shared AI client: API base URL (e.g. mock_anthropic_server.py; unset uses the SDK default),
+# timeouts, connection pool size, process-wide concurrent request cap, then the per-question
+# deadline, retry backoff, hedging percentile (0 disables) and circuit breaker
+AI_CLIENT_SETTINGS = {
+    "base_url": os.getenv("LOYALTYAI_AI_BASE_URL") or None,
+    "request_timeout": float(os.getenv("LOYALTYAI_AI_REQUEST_TIMEOUT", "30")),
+    "connect_timeout": float(os.getenv("LOYALTYAI_AI_CONNECT_TIMEOUT", "5")),
+    "max_connections": int(os.getenv("LOYALTYAI_AI_MAX_CONNECTIONS", "20")),
+    "max_keepalive_connections": int(os.getenv("LOYALTYAI_AI_MAX_KEEPALIVE", "10")),
+    "max_concurrent_requests": int(os.getenv("LOYALTYAI_AI_MAX_CONCURRENT", "8")),
+    "acquire_timeout": float(os.getenv("LOYALTYAI_AI_ACQUIRE_TIMEOUT", "10")),
+    "use_async": os.getenv("LOYALTYAI_AI_USE_ASYNC", "false").lower() == "true",
+    "deadline": float(os.getenv("LOYALTYAI_AI_DEADLINE", "20")),
+    "max_retries": int(os.getenv("LOYALTYAI_AI_MAX_RETRIES", "2")),
+    "retry_base_delay": float(os.getenv("LOYALTYAI_AI_RETRY_BASE_DELAY", "0.25")),
+    "hedge_percentile": float(os.getenv("LOYALTYAI_AI_HEDGE_PERCENTILE", "0")),
+    "breaker_failure_threshold": int(os.getenv("LOYALTYAI_AI_BREAKER_FAILURES", "5")),
+    "breaker_reset_timeout": float(os.getenv("LOYALTYAI_AI_BREAKER_RESET", "30")),
+}
+
+# Answer cache: in-memory LRU size, the TTL shared with the on-disk tier and the
+# question similarity needed to reuse a paraphrase's answer (0 disables paraphrase hits)
+ANSWER_CACHE_ENABLED = os.getenv("LOYALTYAI_ANSWER_CACHE", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("LOYALTYAI_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("LOYALTYAI_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("LOYALTYAI_ANSWER_CACHE_SIMILARITY", "0.6"))
+
+# Metrics export: OpenMetrics over HTTP on this port (GET /metrics) and/or rewritten to
+# this file every interval seconds for a textfile collector; both are off when unset
+METRICS_PORT = int(os.getenv("LOYALTYAI_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("LOYALTYAI_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.getenv("LOYALTYAI_METRICS_FILE_INTERVAL", "15"))
+
+# Request log: every chat turn appended to a JSONL file (requests.jsonl unless
+# overridden) by a background writer; replay it with replay_requests.py
+REQUEST_LOG_ENABLED = os.getenv("LOYALTYAI_REQUEST_LOG", "true").lower() == "true"
+REQUEST_LOG_PATH = os.getenv("LOYALTYAI_REQUEST_LOG_PATH") or LOG_PATH
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("LOYALTYAI_REQUEST_LOG_FLUSH_INTERVAL", "1"))
+
+# Per-stage latency histograms and counters; the registry outlives script reruns,
+# so re-registering on each rerun returns the existing metric
+INTENT_ROUTING_SECONDS = REGISTRY.histogram("loyaltyai_intent_routing_seconds", "Keyword intent routing time")
+RETRIEVAL_SECONDS = REGISTRY.histogram("loyaltyai_retrieval_seconds", "BM25 and vector document search time")
+CONTEXT_SECONDS = REGISTRY.histogram("loyaltyai_context_seconds", "Total get_relevant_context time, routing and retrieval included")
+ANSWER_SECONDS = REGISTRY.histogram("loyaltyai_answer_seconds", "Time to produce an answer; streamed answers run until the last token is rendered", ["mode"])
+MODEL_CALL_SECONDS = REGISTRY.histogram("loyaltyai_model_call_seconds", "Messages API call time, retries included", ["call"])
+MODEL_FIRST_TOKEN_SECONDS = REGISTRY.histogram("loyaltyai_model_first_token_seconds", "Time from opening a streamed call to its first text")
+MODEL_ERRORS = REGISTRY.counter("loyaltyai_model_errors", "Model answers that failed after retries and fell back to an apology", ["call"])
+MODEL_TOKENS = REGISTRY.counter("loyaltyai_model_tokens", "Tokens reported in response usage", ["type"])
+MODEL_COST = REGISTRY.counter("loyaltyai_model_cost_usd", "Estimated model spend", ["dashboard_type", "intent", "profile"])
+DASHBOARD_RENDER_SECONDS = REGISTRY.histogram("loyaltyai_dashboard_render_seconds", "Dashboard tab render time", ["dashboard"])
+LOGIN_SECONDS = REGISTRY.histogram("loyaltyai_login_seconds", "Credential check time")
+LOGINS = REGISTRY.counter("loyaltyai_logins", "Login attempts", ["outcome"])
+
+# User and dashboard data store: JSON files under this directory, checked for changes at most
+# once per interval and hot-reloaded; sections nobody has viewed for the idle time are dropped
+DATA_DIR = os.getenv("LOYALTYAI_DATA_DIR") or DEFAULT_DATA_DIR
+DATA_CHECK_INTERVAL = float(os.getenv("LOYALTYAI_DATA_CHECK_INTERVAL", "1"))
+DATA_IDLE_SECONDS = float(os.getenv("LOYALTYAI_DATA_IDLE_SECONDS", "600"))
+
 # Streamlit page config
 st.set_page_config(
     page_title="LoyaltyAI Assistant",
@@ -18,563 +168,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# User database with hashed passwords and roles
-USERS = {
-    "rishab.bhat": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Rishab Bhat", 
-        "role": "Associate Software Engineer",
-        "team": "Taj Mahal",
-        "manager": "Allesha Fogle",
-        "dashboard_type": "individual"
-    },
-    "britney.duratinsky": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Britney Duratinsky",
-        "role": "Associate Software Engineer", 
-        "team": "Taj Mahal",
-        "manager": "Allesha Fogle",
-        "dashboard_type": "individual"
-    },
-    "scott.forsmann": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Scott Forsmann",
-        "role": "Associate Software Engineer",
-        "team": "Taj Mahal", 
-        "manager": "Allesha Fogle",
-        "dashboard_type": "individual"
-    },
-    "michael.joyce": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Michael Joyce",
-        "role": "Senior Software Engineer",
-        "team": "Machu Picchu",
-        "manager": "Allesha Fogle", 
-        "dashboard_type": "senior_engineer"
-    },
-    "christopher.jimenez": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Christopher Jimenez",
-        "role": "Engineering Director",
-        "team": "Leadership",
-        "manager": None,
-        "dashboard_type": "director"
-    },
-    "connie.cavallo": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Connie Cavallo",
-        "role": "Senior Product Manager",
-        "team": "Product",
-        "manager": "Christopher Jimenez",
-        "dashboard_type": "product_manager"
-    },
-    "swapna.kolimi": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Swapna Kolimi", 
-        "role": "Scrum Master",
-        "team": "Agile",
-        "manager": "Christopher Jimenez",
-        "dashboard_type": "scrum_master"
-    },
-    "allesha.fogle": {
-        "password": hashlib.sha256("optum123".encode()).hexdigest(),
-        "name": "Allesha Fogle",
-        "role": "Engineering Manager",
-        "team": "Onshore Teams",
-        "manager": "Christopher Jimenez",
-        "dashboard_type": "engineering_manager"
-    }
-}
+@st.cache_resource
+def get_data_store():
+    """User and dashboard data shared by all sessions"""
+    return DataStore(DATA_DIR, check_interval=DATA_CHECK_INTERVAL, idle_seconds=DATA_IDLE_SECONDS)
 
-# Dashboard data - Complete and properly structured
-DASHBOARD_DATA = {
-    "director": {
-        "team_burndown": {
-            "taj_mahal": {
-                "planned": 42, 
-                "completed": 28, 
-                "remaining": 14,
-                "velocity": "On Track",
-                "team_lead": "Michael Joyce",
-                "focus_areas": ["Source System Ranking", "Top of Funnel Migration", "Database Performance"],
-                "blockers": 1,
-                "satisfaction": 4.1,
-                "recent_achievements": ["Reduced API timeout errors by 60%", "Kafka migration 70% complete"]
-            },
-            "machu_picchu": {
-                "planned": 38, 
-                "completed": 31, 
-                "remaining": 7,
-                "velocity": "Ahead",
-                "team_lead": "Michael Joyce", 
-                "focus_areas": ["Eligibility Processing", "Device Integrations", "Performance Testing"],
-                "blockers": 2,
-                "satisfaction": 4.3,
-                "recent_achievements": ["Device sync reliability improved 40%", "Load testing automation complete"]
-            },
-            "acropolis": {
-                "planned": 35,
-                "completed": 22,
-                "remaining": 13, 
-                "velocity": "At Risk",
-                "team_lead": "Raj Patel",
-                "focus_areas": ["Platform Stability", "Monitoring", "Legacy System Maintenance"],
-                "blockers": 3,
-                "satisfaction": 3.7,
-                "recent_achievements": ["Monitoring dashboard deployed", "Reduced incident response time by 25%"]
-            },
-            "pyramids": {
-                "planned": 30,
-                "completed": 26,
-                "remaining": 4,
-                "velocity": "Ahead",
-                "team_lead": "Priya Sharma",
-                "focus_areas": ["QA Automation", "Testing Infrastructure", "Quality Gates"],
-                "blockers": 0,
-                "satisfaction": 4.0,
-                "recent_achievements": ["Automated test coverage 95%", "Zero production defects last sprint"]
-            }
-        },
-        "quarterly_metrics": {
-            "deployment_frequency": {
-                "current": 12, 
-                "target": 15, 
-                "trend": "improving",
-                "q4_2024": 8,
-                "improvement": "+50%"
-            },
-            "incident_rate": {
-                "current": 2.3, 
-                "target": 2.0, 
-                "trend": "stable",
-                "p1_incidents": 0,
-                "p2_incidents": 3,
-                "mttr": "45 minutes"
-            },
-            "team_satisfaction": {
-                "current": 4.2, 
-                "target": 4.0, 
-                "trend": "improving",
-                "participation_rate": "94%",
-                "key_drivers": ["Work-life balance", "Technical challenges", "Career growth"]
-            },
-            "velocity_consistency": {
-                "current": 85,
-                "target": 90,
-                "trend": "improving",
-                "predictability_score": "High"
-            },
-            "code_quality": {
-                "coverage": "89%",
-                "sonar_gate": "Passing",
-                "tech_debt_ratio": "12%",
-                "security_issues": 0
-            }
-        },
-        "budget_status": {
-            "q1_personnel": {"used": 1.2, "allocated": 1.5, "percentage": 80, "forecast": "Under budget"},
-            "q1_infrastructure": {"used": 0.3, "allocated": 0.4, "percentage": 75, "trend": "stable"},
-            "q2_forecast": {"personnel": 1.8, "infrastructure": 0.5, "training": 0.2, "tools": 0.1}
-        },
-        "strategic_initiatives": [
-            {
-                "name": "Platform Modernization",
-                "status": "On Track", 
-                "completion": 65,
-                "owner": "Engineering Teams",
-                "key_milestones": ["Kafka Migration (70% complete)", "Database Optimization (40% complete)", "API Modernization (Planning)"],
-                "budget": "$2.1M allocated",
-                "timeline": "Q1-Q3 2025"
-            },
-            {
-                "name": "Scalability Enhancement", 
-                "status": "Planning",
-                "completion": 15,
-                "owner": "Platform Team",
-                "key_milestones": ["Architecture Review (Complete)", "Capacity Planning (In Progress)", "Implementation (Q2)"],
-                "budget": "$1.5M allocated",
-                "timeline": "Q2-Q4 2025"
-            },
-            {
-                "name": "Developer Experience Improvement",
-                "status": "On Track",
-                "completion": 45,
-                "owner": "All Teams",
-                "key_milestones": ["CI/CD Enhancement (80%)", "Testing Automation (90%)", "Documentation Portal (60%)"],
-                "budget": "$800K allocated",
-                "timeline": "Q1-Q2 2025"
-            }
-        ],
-        "risk_register": [
-            {
-                "risk": "Kafka Migration Timeline Slip",
-                "probability": "Medium",
-                "impact": "High", 
-                "mitigation": "Additional contractor resources allocated, fallback plan prepared",
-                "owner": "Allesha Fogle",
-                "status": "Monitoring"
-            },
-            {
-                "risk": "Key Engineer Attrition",
-                "probability": "Low",
-                "impact": "High",
-                "mitigation": "Retention bonuses, career development plans, competitive compensation review",
-                "owner": "Christopher Jimenez",
-                "status": "Mitigated"
-            },
-            {
-                "risk": "Database Performance Degradation",
-                "probability": "Medium",
-                "impact": "Medium",
-                "mitigation": "Proactive monitoring, performance optimization sprint planned",
-                "owner": "Scott Forsmann",
-                "status": "In Progress"
-            }
-        ],
-        "hiring_pipeline": [
-            {"position": "Senior Software Engineer", "team": "Taj Mahal", "candidates": 3, "stage": "Final Interviews", "hire_date": "2025-02-15"},
-            {"position": "DevOps Engineer", "team": "Platform", "candidates": 2, "stage": "Technical Assessment", "hire_date": "2025-03-01"},
-            {"position": "Product Manager", "team": "Product", "candidates": 4, "stage": "Offer Extended", "hire_date": "2025-02-01"},
-            {"position": "QA Automation Engineer", "team": "Pyramids", "candidates": 1, "stage": "Background Check", "hire_date": "2025-01-30"}
-        ],
-        "compliance_status": {
-            "security_reviews": {"completed": 12, "planned": 15, "overdue": 0},
-            "privacy_assessments": {"completed": 8, "planned": 10, "critical": 0},
-            "audit_findings": {"open": 2, "closed_this_quarter": 8, "high_priority": 0}
-        }
-    },
-    "individual": {
-        "rishab": {
-            "my_stories": [
-                {
-                    "id": "LY-1847",
-                    "title": "Implement Source System Ranking Algorithm",
-                    "status": "In Progress",
-                    "points": 8,
-                    "acceptance_criteria": [
-                        "System can rank member data sources by reliability score (0-100)",
-                        "Algorithm handles conflicts between UHC and Optum data sources", 
-                        "Performance meets SLA of under 200ms response time for 10K requests",
-                        "All edge cases documented and tested (duplicate members, null values)",
-                        "Integration with existing Loyalty-Member service APIs",
-                        "Configurable weighting system for different data quality metrics"
-                    ],
-                    "tasks": [
-                        {"task": "Design ranking algorithm with weighted scoring", "status": "Complete"},
-                        {"task": "Implement core logic with Spring Boot service", "status": "In Progress"},
-                        {"task": "Add comprehensive unit tests (JUnit)", "status": "To Do"},
-                        {"task": "Performance testing with 50K member dataset", "status": "To Do"},
-                        {"task": "Integration testing with Kafka event streams", "status": "To Do"},
-                        {"task": "Documentation and code review", "status": "To Do"}
-                    ],
-                    "description": "Build intelligent ranking system to prioritize member data from multiple sources (UHC, Optum, EDG) based on data freshness, completeness, and historical accuracy"
-                },
-                {
-                    "id": "LY-1863",
-                    "title": "Source System Health Monitoring Dashboard",
-                    "status": "Code Review",
-                    "points": 5,
-                    "acceptance_criteria": [
-                        "Real-time monitoring of all 12 external source systems",
-                        "Automated alerts for system degradation via Splunk",
-                        "Dashboard shows health status with 99.9% uptime SLA tracking",
-                        "Integration with existing Kubernetes health checks"
-                    ],
-                    "tasks": [
-                        {"task": "Set up monitoring endpoints for all source systems", "status": "Complete"},
-                        {"task": "Configure Splunk alerting rules and thresholds", "status": "Complete"},
-                        {"task": "Create React dashboard with real-time updates", "status": "In Review"},
-                        {"task": "Add automated failover logic", "status": "In Review"}
-                    ],
-                    "description": "Monitor health and availability of external data sources including UHC eligibility API, device integration services, and pharmacy systems"
-                }
-            ]
-        },
-        "britney": {
-            "my_stories": [
-                {
-                    "id": "LY-1834",
-                    "title": "Migrate Top of Funnel Script Logic to Kafka",
-                    "status": "In Progress",
-                    "points": 13,
-                    "acceptance_criteria": [
-                        "All Top of Funnel logic converted to event-driven Kafka processing",
-                        "Zero data loss during migration (validated with checksums)",
-                        "Performance matches or exceeds current batch processing (4-6 hours)",
-                        "Rollback plan validated and tested in stage environment"
-                    ],
-                    "tasks": [
-                        {"task": "Analyze current Top of Funnel Perl script (2000+ lines)", "status": "Complete"},
-                        {"task": "Design Kafka event structure and schema", "status": "Complete"},
-                        {"task": "Implement Java Spring Boot event processors", "status": "In Progress"},
-                        {"task": "Set up Kafka topics with proper partitioning", "status": "In Progress"}
-                    ],
-                    "description": "Replace legacy Perl script (daily batch processing) with modern event-driven Kafka architecture for real-time member eligibility processing"
-                }
-            ]
-        },
-        "scott": {
-            "my_stories": [
-                {
-                    "id": "LY-1849",
-                    "title": "Member Data Migration Performance Optimization",
-                    "status": "In Progress",
-                    "points": 8,
-                    "acceptance_criteria": [
-                        "Migration performance improved by 50% (from 12hrs to 6hrs)",
-                        "Database connection pooling optimized for 10M+ member records",
-                        "Parallel processing implemented with thread safety guarantees",
-                        "Data integrity maintained with checksum validation"
-                    ],
-                    "tasks": [
-                        {"task": "Profile current migration performance bottlenecks", "status": "Complete"},
-                        {"task": "Implement parallel processing with ExecutorService", "status": "In Progress"},
-                        {"task": "Optimize database queries and connection pooling", "status": "In Progress"}
-                    ],
-                    "description": "Optimize large-scale member data migration processes for annual enrollment period handling 15M+ member records"
-                }
-            ]
-        },
-        "my_incidents": [
-            {
-                "id": "INC0012845", 
-                "title": "Member eligibility sync failure - UHC API timeout", 
-                "priority": "P2", 
-                "status": "In Progress", 
-                "description": "UHC member eligibility API experiencing intermittent timeouts (>30s response time) causing 15% of eligibility checks to fail during peak hours",
-                "steps_taken": [
-                    "Verified database connectivity - all connections healthy",
-                    "Checked Kafka consumer lag - normal processing times",
-                    "Reviewed error logs - 500+ timeout errors in last 4 hours",
-                    "Contacted UHC API team - investigating on their end",
-                    "Implemented temporary retry logic with exponential backoff"
-                ],
-                "next_actions": [
-                    "Escalate to UHC API team lead (John Smith)",
-                    "Implement circuit breaker pattern for API calls",
-                    "Schedule fix deployment for tonight's maintenance window",
-                    "Add enhanced monitoring for API response times"
-                ],
-                "impact": "Affecting 5,000+ members per hour during peak enrollment",
-                "assigned_to": "Rishab Bhat",
-                "created_date": "2025-01-20 09:30:00",
-                "sla_breach": False
-            }
-        ],
-        "on_call_schedule": [
-            {"week": "Current (Jan 20-26)", "engineer": "Scott Forsmann", "phone": "612-555-0134", "backup": "Ravali Botta"},
-            {"week": "Next (Jan 27-Feb 2)", "engineer": "Ravali Botta", "phone": "612-555-0178", "backup": "Michael Joyce"},
-            {"week": "Following (Feb 3-9)", "engineer": "Michael Joyce", "phone": "612-555-0189", "backup": "Sofia Khan"},
-            {"week": "Feb 10-16", "engineer": "Sofia Khan", "phone": "612-555-0167", "backup": "Rishab Bhat"}
-        ],
-        "recent_deployments": [
-            {"version": "v2.1.3", "date": "2025-01-19", "status": "Success", "components": ["loyalty-member", "loyalty-eligibility"]},
-            {"version": "v2.1.2", "date": "2025-01-17", "status": "Success", "components": ["loyalty-services"]},
-            {"version": "v2.1.1", "date": "2025-01-15", "status": "Rollback", "components": ["loyalty-member"], "reason": "Database migration timeout"}
-        ],
-        "team_metrics": {
-            "sprint_completion": "87%",
-            "code_coverage": "92%",
-            "avg_cycle_time": "4.2 days",
-            "bug_escape_rate": "1.8%"
-        }
-    },
-    "senior_engineer": {
-        "team_metrics": {
-            "sprint_velocity": 38,
-            "velocity_trend": "+12% from last sprint",
-            "code_coverage": 87,
-            "coverage_trend": "+3% improvement",
-            "bug_escape_rate": 2.1,
-            "avg_cycle_time": 4.2,
-            "team_satisfaction": 4.3,
-            "deployment_frequency": "Daily",
-            "mttr": "45 minutes"
-        },
-        "team_members": [
-            {
-                "name": "Sofia Khan", 
-                "role": "Associate SWE", 
-                "current_task": "LY-1851 - Device sync reliability improvements",
-                "status": "On Track",
-                "current_sprint_load": "85%",
-                "skills": ["Java", "Spring Boot", "Kafka", "React"],
-                "recent_achievements": ["Reduced device sync failures by 40%", "Mentored 2 new contractors"],
-                "goals": ["Complete Java certification", "Lead architecture discussions"]
-            },
-            {
-                "name": "Ravali Botta", 
-                "role": "Software Engineer", 
-                "current_task": "LY-1852 - Eligibility rule migration framework",
-                "status": "Ahead",
-                "current_sprint_load": "95%",
-                "skills": ["Java", "MySQL", "Kubernetes", "Python"],
-                "recent_achievements": ["Designed new eligibility framework", "Improved query performance by 30%"],
-                "goals": ["Tech lead promotion track", "AWS certification"]
-            }
-        ],
-        "priority_code_reviews": [
-            {
-                "pr": "PR #234", 
-                "author": "Sofia Khan", 
-                "title": "Add device sync retry logic with exponential backoff", 
-                "status": "Needs Review",
-                "complexity": "High",
-                "files_changed": 8,
-                "urgency": "Critical",
-                "description": "Critical fix for device sync failures affecting 15% of Fitbit users",
-                "lines_added": 156,
-                "lines_deleted": 23,
-                "commits": 4,
-                "reviewers_needed": 2,
-                "estimated_review_time": "45 minutes"
-            },
-            {
-                "pr": "PR #236", 
-                "author": "Ravali Botta", 
-                "title": "Eligibility rule engine refactor for performance", 
-                "status": "Changes Requested",
-                "complexity": "Medium", 
-                "files_changed": 12,
-                "urgency": "Medium",
-                "description": "Refactoring eligibility processing for 40% performance improvement",
-                "lines_added": 234,
-                "lines_deleted": 189,
-                "commits": 6,
-                "feedback": "Add more comprehensive unit tests, consider edge cases for dual eligibility"
-            }
-        ]
-    },
-    "engineering_manager": {
-        "direct_reports": [
-            {
-                "name": "Rishab Bhat", 
-                "team": "Taj Mahal", 
-                "role": "Associate SWE", 
-                "current_sprint_load": "85%",
-                "performance": "Meeting Expectations",
-                "years_experience": 2.5,
-                "key_skills": ["Java", "Spring Boot", "Source System Integration", "Data Processing"],
-                "current_focus": "Source System Ranking Algorithm implementation",
-                "career_goals": ["Senior SWE promotion", "Architecture knowledge", "Team leadership"],
-                "last_review": "2024-12-15",
-                "next_review": "2025-03-15",
-                "development_areas": ["System design", "Performance optimization"],
-                "recent_wins": ["Delivered complex ranking algorithm on time", "Mentored new contractor"]
-            },
-            {
-                "name": "Britney Duratinsky", 
-                "team": "Taj Mahal", 
-                "role": "Associate SWE", 
-                "current_sprint_load": "95%",
-                "performance": "Exceeds Expectations",
-                "years_experience": 3.0,
-                "key_skills": ["Java", "Kafka", "Event-Driven Architecture", "Legacy System Migration"],
-                "current_focus": "Top of Funnel Kafka migration leadership",
-                "career_goals": ["Tech Lead role", "Architecture specialization", "Cross-team collaboration"],
-                "last_review": "2024-12-15", 
-                "next_review": "2025-03-15",
-                "development_areas": ["Team leadership", "Stakeholder communication"],
-                "recent_wins": ["Leading critical Kafka migration", "Reduced processing time by 60%"]
-            },
-            {
-                "name": "Scott Forsmann", 
-                "team": "Taj Mahal", 
-                "role": "Associate SWE", 
-                "current_sprint_load": "80%",
-                "performance": "Meeting Expectations",
-                "years_experience": 2.0,
-                "key_skills": ["Database Optimization", "Data Migration", "Performance Tuning", "MySQL"],
-                "current_focus": "Large-scale data migration optimization",
-                "career_goals": ["Database expertise", "Performance engineering", "Senior SWE promotion"],
-                "last_review": "2024-12-15",
-                "next_review": "2025-03-15", 
-                "development_areas": ["Distributed systems", "Monitoring and observability"],
-                "recent_wins": ["50% improvement in migration performance", "Implemented robust rollback procedures"]
-            }
-        ],
-        "team_performance": {
-            "taj_mahal": {
-                "velocity": 42, 
-                "target": 45, 
-                "efficiency": "93%", 
-                "satisfaction": 4.1,
-                "issues": 1,
-                "strengths": ["Strong collaboration", "Technical expertise", "Problem-solving"],
-                "areas_for_improvement": ["Story estimation accuracy", "Cross-functional communication"],
-                "recent_improvements": ["Reduced technical debt by 15%", "Improved code review turnaround"]
-            },
-            "machu_picchu": {
-                "velocity": 38, 
-                "target": 40, 
-                "efficiency": "95%", 
-                "satisfaction": 4.3,
-                "issues": 2,
-                "strengths": ["Innovation", "Quality focus", "Mentorship"],
-                "areas_for_improvement": ["Capacity planning", "Documentation"],
-                "recent_improvements": ["Automated testing coverage 90%+", "Reduced cycle time by 1 day"]
-            }
-        }
-    },
-    "product_manager": {
-        "active_epics": [
-            {
-                "epic": "EPIC-101", 
-                "title": "Kafka Migration Initiative", 
-                "progress": 70, 
-                "target_date": "2025-03-15", 
-                "status": "On Track",
-                "business_value": "$500K annual savings",
-                "risk_level": "Medium",
-                "dependencies": ["Platform team", "Database migration"],
-                "key_features": ["Event-driven eligibility", "Real-time processing", "Legacy script retirement"],
-                "success_metrics": ["Processing time <5min", "Zero data loss", "50% cost reduction"]
-            },
-            {
-                "epic": "EPIC-102", 
-                "title": "Mobile App Integration", 
-                "progress": 30, 
-                "target_date": "2025-04-30", 
-                "status": "At Risk",
-                "business_value": "15% member engagement increase",
-                "risk_level": "High",
-                "blockers": ["iOS review process", "API rate limiting"],
-                "key_features": ["Push notifications", "Activity tracking", "Reward redemption"],
-                "success_metrics": ["DAU increase 20%", "App store rating >4.5", "API response <2s"]
-            }
-        ]
-    },
-    "scrum_master": {
-        "team_health": {
-            "taj_mahal": {
-                "velocity_trend": "stable", 
-                "blockers": 1, 
-                "satisfaction": 4.1, 
-                "capacity": "85%",
-                "team_size": 4,
-                "sprint_goal_achievement": "80%",
-                "retrospective_actions": 3,
-                "key_strengths": ["Technical expertise", "Collaboration"],
-                "improvement_areas": ["Story estimation", "Cross-team communication"],
-                "last_retrospective": "2025-01-15",
-                "upcoming_risks": ["Kafka migration complexity", "Resource constraints"]
-            },
-            "machu_picchu": {
-                "velocity_trend": "improving", 
-                "blockers": 2, 
-                "satisfaction": 4.3, 
-                "capacity": "95%",
-                "team_size": 6,
-                "sprint_goal_achievement": "90%",
-                "retrospective_actions": 2,
-                "key_strengths": ["Innovation", "Quality focus", "Knowledge sharing"],
-                "improvement_areas": ["Capacity planning", "Documentation"],
-                "last_retrospective": "2025-01-16",
-                "upcoming_risks": ["High utilization", "Technical debt"]
-            }
-        }
-    }
-}
+# User database with hashed passwords and roles, from data/users.json. These mapping views
+# serve scripts like benchmark.py; the app itself reads one snapshot per login or render
+USERS = SectionView(get_data_store(), "users")
+
+# Dashboard data by dashboard type, from data/dashboards/<type>.json; each type loads when first viewed
+DASHBOARD_DATA = SectionDirectory(get_data_store(), "dashboards")
 
 # Custom CSS
 st.markdown("""
@@ -664,9 +268,10 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def authenticate_user(username, password):
-    if username in USERS:
-        if hash_password(password) == USERS[username]["password"]:
-            return USERS[username]
+    users = get_data_store().get("users")
+    if username in users:
+        if hash_password(password) == users[username]["password"]:
+            return users[username]
     return None
 
 def login_page():
@@ -677,7 +282,9 @@ def login_page():
     password = st.text_input("Password", type="password", placeholder="Password")
     
     if st.button("Login", use_container_width=True):
-        user = authenticate_user(username, password)
+        with LOGIN_SECONDS.time():
+            user = authenticate_user(username, password)
+        LOGINS.inc(outcome="success" if user else "failure")
         if user:
             st.session_state.user = user
             st.session_state.username = username
@@ -690,45 +297,67 @@ def login_page():
 
 @st.cache_resource
 def initialize_ai_client():
-    """Initialize AI API client"""
+    """Initialize the AI API client shared by all sessions; None without an API key.
+
+    A client that fails to build raises rather than quietly leaving the app in
+    demo mode; the failure is not cached, so the next rerun tries again.
+    """
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         return None
-    
+    return AIClient(api_key=api_key, on_discarded_usage=record_discarded_usage, **AI_CLIENT_SETTINGS)
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Start the configured metrics exporters once per server process"""
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        return client
-    except Exception as e:
-        logger.error(f"Failed to initialize AI client: {e}")
-        return None
+        if METRICS_PORT:
+            start_http_exporter(METRICS_PORT)
+        if METRICS_FILE:
+            start_file_exporter(METRICS_FILE, METRICS_FILE_INTERVAL)
+    except OSError as e:
+        logger.error(f"Failed to start metrics exporter: {e}")
+    return True
 
-def get_relevant_context(question: str, user_info: dict) -> str:
-    """Get context based on question keywords - enhanced with user-specific data"""
-    question_lower = question.lower()
-    
-    # Get user-specific team context
-    user_team = user_info.get('team', 'Unknown')
-    user_role = user_info.get('role', 'Unknown')
-    
-    # Extract potential names from the question to check against our database
-    potential_names = []
-    words = question_lower.split()
-    for i, word in enumerate(words):
-        if word in ['who', 'whos', "who's"] and i + 1 < len(words):
-            potential_names.append(words[i + 1])
-        elif word in ['about', 'find', 'tell'] and i + 1 < len(words):
-            potential_names.append(words[i + 1])
-    
-    # Check if asking about someone not in our team database
-    known_people = ['rishab', 'britney', 'scott', 'michael', 'sofia', 'ravali', 'allesha', 'christopher', 'connie', 'swapna', 'shasikumar', 'ganesh', 'nagarjuna', 'ajit']
-    for name in potential_names:
-        clean_name = name.lower().strip('.,?!')
-        if clean_name not in known_people and len(clean_name) > 2:
-            return f"I don't have information about '{name}' in our current team database. The people I know about include the Taj Mahal team (Rishab Bhat, Britney Duratinsky, Scott Forsmann), Machu Picchu team (Sofia Khan, Ravali Botta, Michael Joyce, and contractors), and leadership team (Allesha Fogle, Christopher Jimenez). Could you be thinking of one of these team members?"
-    
+# Intent routing table in priority order: (intent, phrases, allowed roles, required team).
+# The first intent whose phrases appear in the question and whose guards pass wins.
+INTENT_RULES = [
     # MANAGEMENT REPORTING - Check these first since they're role-specific
-    if any(phrase in question_lower for phrase in ["burndown", "sprint progress", "team velocity", "how are we doing", "tell me the burndown"]) and user_role in ["Engineering Manager", "Engineering Director", "Senior Software Engineer"]:
-        return """Current Sprint Burndown (Sprint 23, Jan 15-29):
+    ("burndown", ["burndown", "sprint progress", "team velocity", "how are we doing", "tell me the burndown"], ["Engineering Manager", "Engineering Director", "Senior Software Engineer"], None),
+    # MANAGEMENT REPORTING - Team Health
+    ("team_health", ["team health", "team satisfaction", "team morale", "how is the team"], ["Engineering Manager", "Engineering Director"], None),
+    # MANAGEMENT REPORTING - Budget Status
+    ("budget", ["budget", "spending", "cost", "financial", "expenses", "budget status"], ["Engineering Manager", "Engineering Director"], None),
+    # TECHNICAL UNBLOCKING - Database Connection (Most specific first)
+    ("database_connection", ["connect to the database", "connect to database", "database connection", "connect to db", "connect to the db", "db connection", "how do i connect"], None, None),
+    # TECHNICAL UNBLOCKING - Deployment Process
+    ("deployment_process", ["how to deploy", "deployment process", "release process", "how to push code", "deploy my code", "how do i deploy"], None, None),
+    # TECHNICAL UNBLOCKING - Troubleshooting (Specific error patterns first)
+    ("app_wont_start", ["app won't start", "application won't start", "application isn't starting", "my app won't start", "won't start"], None, None),
+    # TECHNICAL UNBLOCKING - Local Development
+    ("local_setup", ["local setup", "run locally", "local development", "dev environment", "set up locally", "setup local"], None, None),
+    # TECHNICAL UNBLOCKING - API Endpoints
+    ("api_endpoints", ["api endpoints", "api docs", "swagger", "rest api", "how to call api", "api documentation"], None, None),
+    # TECHNICAL UNBLOCKING - General Troubleshooting
+    ("troubleshooting", ["troubleshoot", "debug", "not working", "how do i fix", "problem", "issue"], None, None),
+    # TEAM INFORMATION - Specific teams first
+    ("taj_mahal_team", ["taj mahal", "my team", "our team"], None, "Taj Mahal"),
+    ("machu_picchu_team", ["machu picchu", "machu picchu team"], None, None),
+    # WORK AND SCHEDULE INFORMATION
+    ("my_work", ["my work", "my stories", "my tasks"], None, None),
+    ("on_call", ["on call", "oncall", "who's on call"], None, None),
+    ("sprint_goals", ["sprint", "goals", "current sprint"], None, None),
+    # TECHNICAL INFORMATION
+    ("tech_stack", ["tech stack", "technology", "tools"], None, None),
+    ("kafka_migration", ["kafka", "migration", "top of funnel"], None, None),
+    # GENERAL DATABASE ISSUES (less specific, comes after connection instructions)
+    ("database_issues", ["database", "db issues", "database problems"], None, None),
+]
+
+# Hardcoded context returned for each matched intent
+INTENT_CONTEXTS = {
+    # MANAGEMENT REPORTING - Sprint Burndown
+    "burndown": """Current Sprint Burndown (Sprint 23, Jan 15-29):
         
         **Taj Mahal Team:**
         - Planned: 42 story points
@@ -759,11 +388,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         **Action Items:**
         - Consider moving LY-1847 subtasks to next sprint
         - Schedule production deployment for Friday
-        - Review capacity planning for next sprint"""
-    
+        - Review capacity planning for next sprint""",
+
     # MANAGEMENT REPORTING - Team Health
-    elif any(phrase in question_lower for phrase in ["team health", "team satisfaction", "team morale", "how is the team"]) and user_role in ["Engineering Manager", "Engineering Director"]:
-        return """Team Health Dashboard:
+    "team_health": """Team Health Dashboard:
         
         **Overall Satisfaction: 4.2/5.0** (↗️ +0.3 from last quarter)
         
@@ -788,11 +416,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         - Schedule 1:1s with high-performers for retention
         - Address documentation time in sprint planning
         - Continue investing in career development
-        - Monitor Machu Picchu team utilization"""
-    
+        - Monitor Machu Picchu team utilization""",
+
     # MANAGEMENT REPORTING - Budget Status
-    elif any(phrase in question_lower for phrase in ["budget", "spending", "cost", "financial", "expenses", "budget status"]) and user_role in ["Engineering Manager", "Engineering Director"]:
-        return """Q1 2025 Budget Status:
+    "budget": """Q1 2025 Budget Status:
         
         **Personnel (80% utilized):**
         - Used: $1.2M of $1.5M allocated
@@ -822,11 +449,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         **Cost Savings Initiatives:**
         - Kafka migration: $500K annual savings
         - Database optimization: $200K annual savings
-        - Cloud rightsizing: $150K annual savings"""
-    
+        - Cloud rightsizing: $150K annual savings""",
+
     # TECHNICAL UNBLOCKING - Database Connection (Most specific first)
-    elif any(phrase in question_lower for phrase in ["connect to the database", "connect to database", "database connection", "connect to db", "connect to the db", "db connection", "how do i connect"]):
-        return """Database Connection Instructions:
+    "database_connection": """Database Connection Instructions:
         
         **Production DB:**
         - Host: loyalty-prod-mysql.optum.com:3306
@@ -854,11 +480,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         ```bash
         # Test connection
         mysql -h loyalty-dev-mysql.optum.com -P 3306 -u $LOYALTY_DB_USER -p$LOYALTY_DB_PASS loyalty_platform_dev
-        ```"""
-    
+        ```""",
+
     # TECHNICAL UNBLOCKING - Deployment Process
-    elif any(phrase in question_lower for phrase in ["how to deploy", "deployment process", "release process", "how to push code", "deploy my code", "how do i deploy"]):
-        return """Deployment Process:
+    "deployment_process": """Deployment Process:
         
         **Standard Deployment:**
         1. Create PR against main branch
@@ -886,11 +511,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         
         **Monitoring:**
         - Deployment dashboard: https://jenkins.optum.com/loyalty
-        - Logs: https://splunk.optum.com/loyalty-deploys"""
-    
+        - Logs: https://splunk.optum.com/loyalty-deploys""",
+
     # TECHNICAL UNBLOCKING - Troubleshooting (Specific error patterns first)
-    elif any(phrase in question_lower for phrase in ["app won't start", "application won't start", "application isn't starting", "my app won't start", "won't start"]):
-        return """Application Won't Start - Troubleshooting:
+    "app_wont_start": """Application Won't Start - Troubleshooting:
         
         **Common Causes & Solutions:**
         1. **Port Already in Use:**
@@ -924,11 +548,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         **Quick Fix Command:**
         ```bash
         ./scripts/restart-local.sh
-        ```"""
-    
+        ```""",
+
     # TECHNICAL UNBLOCKING - Local Development
-    elif any(phrase in question_lower for phrase in ["local setup", "run locally", "local development", "dev environment", "set up locally", "setup local"]):
-        return """Local Development Setup:
+    "local_setup": """Local Development Setup:
         
         **Prerequisites:**
         - Java 17+ installed
@@ -956,11 +579,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         **Useful Commands:**
         - Reset DB: `./scripts/reset-local-db.sh`
         - Run tests: `mvn test`
-        - Build: `mvn clean package`"""
-    
+        - Build: `mvn clean package`""",
+
     # TECHNICAL UNBLOCKING - API Endpoints
-    elif any(phrase in question_lower for phrase in ["api endpoints", "api docs", "swagger", "rest api", "how to call api", "api documentation"]):
-        return """Loyalty Platform API Information:
+    "api_endpoints": """Loyalty Platform API Information:
         
         **Base URLs:**
         - Dev: https://loyalty-api-dev.optum.com/v1
@@ -983,11 +605,10 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         
         **Rate Limits:**
         - 1000 requests/minute per client
-        - 10,000 requests/hour per client"""
-    
+        - 10,000 requests/hour per client""",
+
     # TECHNICAL UNBLOCKING - General Troubleshooting
-    elif any(phrase in question_lower for phrase in ["troubleshoot", "debug", "not working", "how do i fix", "problem", "issue"]):
-        return """General Troubleshooting Guide:
+    "troubleshooting": """General Troubleshooting Guide:
         
         **Database Connection Issues:**
         - Verify VPN connection
@@ -1008,19 +629,17 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         **Who to Contact:**
         - Database issues: DBA team (dba-team@optum.com)
         - Infrastructure: Platform team (#platform-support)
-        - Business logic: Product team (Connie Cavallo)"""
-    
+        - Business logic: Product team (Connie Cavallo)""",
+
     # TEAM INFORMATION - Specific teams first
-    elif any(phrase in question_lower for phrase in ["taj mahal", "my team", "our team"]) and user_team == "Taj Mahal":
-        return """The Taj Mahal team consists of:
+    "taj_mahal_team": """The Taj Mahal team consists of:
         - Rishab Bhat (Associate SWE) - working on Source System Ranking Algorithm
         - Britney Duratinsky (Associate SWE) - leading the Kafka migration from Top of Funnel script
         - Scott Forsmann (Associate SWE) - focusing on database performance optimization
         - Team Lead: Allesha Fogle (Engineering Manager)
-        The team focuses on platform engineering, source system integration, and performance optimization."""
-    
-    elif any(phrase in question_lower for phrase in ["machu picchu", "machu picchu team"]):
-        return """The Machu Picchu team includes:
+        The team focuses on platform engineering, source system integration, and performance optimization.""",
+
+    "machu_picchu_team": """The Machu Picchu team includes:
         - Sofia Khan (Associate SWE) - Device sync reliability improvements
         - Ravali Botta (Software Engineer) - Eligibility rule migration framework  
         - Michael Joyce (Senior SWE) - Team technical lead
@@ -1028,239 +647,884 @@ def get_relevant_context(question: str, user_info: dict) -> str:
         - Ganesh Nettem (Contractor) - Kafka consumer lag monitoring
         - Nagarjuna Reddy (Software Engineer) - Load testing automation
         - Ajit Krishnan (Software Engineer) - Database connection pool optimization
-        Michael Joyce serves as the Senior Engineer leading the team."""
-    
-    # WORK AND SCHEDULE INFORMATION
-    elif any(phrase in question_lower for phrase in ["my work", "my stories", "my tasks"]):
-        username = user_info.get('name', '').lower().split()[0]
-        if username == 'rishab':
-            return "Your current work: LY-1847 (Source System Ranking Algorithm - In Progress, 8 pts), LY-1863 (Source System Health Monitoring Dashboard - Code Review, 5 pts). Focus areas: data source ranking, API integration, performance optimization."
-        elif username == 'britney':
-            return "Your current work: Leading LY-1834 (Kafka Migration - In Progress, 13 pts). You're converting the Top of Funnel Perl script to event-driven Kafka processing. Critical project for platform modernization."
-        elif username == 'scott':
-            return "Your current work: LY-1849 (Database Migration Performance Optimization - In Progress, 8 pts). Focus: improving migration performance by 50%, optimizing for 10M+ member records."
-        else:
-            return f"Your work assignments are visible in your individual dashboard. Current sprint focus varies by team role."
-    
-    elif any(phrase in question_lower for phrase in ["on call", "oncall", "who's on call"]):
-        return "Scott Forsmann is currently on call this week (Jan 20-26). You can reach him at 612-555-0134 with backup Ravali Botta. Next week Ravali Botta will be on call (612-555-0178), followed by Michael Joyce (612-555-0189)."
-    
-    elif any(phrase in question_lower for phrase in ["sprint", "goals", "current sprint"]):
-        return """Current Sprint 23 goals (Jan 15-29, 2025):
+        Michael Joyce serves as the Senior Engineer leading the team.""",
+
+    "on_call": "Scott Forsmann is currently on call this week (Jan 20-26). You can reach him at 612-555-0134 with backup Ravali Botta. Next week Ravali Botta will be on call (612-555-0178), followed by Michael Joyce (612-555-0189).",
+
+    "sprint_goals": """Current Sprint 23 goals (Jan 15-29, 2025):
         1) Kafka Migration Phase 1 - eliminate Top of Funnel script dependencies (Britney leading)
         2) Source System Ranking Algorithm implementation (Rishab)
         3) Database performance improvements for member lookup queries (Scott)
         4) Device sync reliability improvements (Sofia - Machu Picchu team)
-        5) Fix dual eligibility conflict resolution"""
-    
+        5) Fix dual eligibility conflict resolution""",
+
     # TECHNICAL INFORMATION
-    elif any(phrase in question_lower for phrase in ["tech stack", "technology", "tools"]):
-        return "Our tech stack: Java Spring Boot (backend services), MySQL (on-premises database), Kubernetes (container orchestration), Apache Kafka (messaging), Splunk (monitoring/logging), React (some frontend components), Capillary Technologies (main frontend platform)."
-    
-    elif any(phrase in question_lower for phrase in ["kafka", "migration", "top of funnel"]):
-        return "The Kafka migration (led by Britney Duratinsky) involves replacing the legacy Top of Funnel Perl script with event-driven processing. This eliminates daily batch processing delays and enables real-time member eligibility updates. Currently 70% complete."
-    
+    "tech_stack": "Our tech stack: Java Spring Boot (backend services), MySQL (on-premises database), Kubernetes (container orchestration), Apache Kafka (messaging), Splunk (monitoring/logging), React (some frontend components), Capillary Technologies (main frontend platform).",
+
+    "kafka_migration": "The Kafka migration (led by Britney Duratinsky) involves replacing the legacy Top of Funnel Perl script with event-driven processing. This eliminates daily batch processing delays and enables real-time member eligibility updates. Currently 70% complete.",
+
     # GENERAL DATABASE ISSUES (less specific, comes after connection instructions)
-    elif any(phrase in question_lower for phrase in ["database", "db issues", "database problems"]):
-        return "For database issues: Contact DBA team at dba-team@optum.com. For urgent problems, escalate to Maria Garcia or platform team. Common issues: connection pool exhaustion, query performance problems. Scott Forsmann is our database optimization specialist."
+    "database_issues": "For database issues: Contact DBA team at dba-team@optum.com. For urgent problems, escalate to Maria Garcia or platform team. Common issues: connection pool exhaustion, query performance problems. Scott Forsmann is our database optimization specialist.",
+}
+
+# Who is on which team; part of every prompt's cached team reference
+TEAM_ROSTER = "This is the LoyaltyAI demo system with realistic Optum team data. The complete team roster includes: Taj Mahal team (Rishab Bhat, Britney Duratinsky, Scott Forsmann), Machu Picchu team (Sofia Khan, Ravali Botta, Michael Joyce, Shasikumar Bommineni, Ganesh Nettem, Nagarjuna Reddy, Ajit Krishnan), and leadership (Allesha Fogle, Christopher Jimenez, Connie Cavallo, Swapna Kolimi). All information is part of the demonstration dataset."
+
+# Intent phrases as matched against normalized questions, so "on-call" and "whos on call" still route
+INTENT_PHRASES = {
+    intent: sorted({normalize_question(phrase) for phrase in phrases}, key=len, reverse=True)
+    for intent, phrases, _, _ in INTENT_RULES
+}
+
+INTENT_WORDS = {word for phrases in INTENT_PHRASES.values() for phrase in phrases for word in phrase.split()}
+
+@st.cache_resource
+def get_intent_matcher():
+    """Compile all intent phrases into a single multi-pattern matcher"""
+    return PhraseMatcher(INTENT_PHRASES.items())
+
+def match_intent(question_lower: str, user_info: dict):
+    """Return the highest-priority intent matching the question, respecting role/team guards"""
+    matched = get_intent_matcher().match(normalize_question(question_lower))
+    if not matched:
+        return None
     
+    user_team = user_info.get('team', 'Unknown')
+    user_role = user_info.get('role', 'Unknown')
+    for intent, _, allowed_roles, required_team in INTENT_RULES:
+        if intent not in matched:
+            continue
+        if allowed_roles is not None and user_role not in allowed_roles:
+            continue
+        if required_team is not None and user_team != required_team:
+            continue
+        return intent
+    return None
+
+def get_my_work_context(user_info: dict) -> str:
+    """Get the current work assignments for the asking user"""
+    username = user_info.get('name', '').lower().split()[0]
+    if username == 'rishab':
+        return "Your current work: LY-1847 (Source System Ranking Algorithm - In Progress, 8 pts), LY-1863 (Source System Health Monitoring Dashboard - Code Review, 5 pts). Focus areas: data source ranking, API integration, performance optimization."
+    elif username == 'britney':
+        return "Your current work: Leading LY-1834 (Kafka Migration - In Progress, 13 pts). You're converting the Top of Funnel Perl script to event-driven Kafka processing. Critical project for platform modernization."
+    elif username == 'scott':
+        return "Your current work: LY-1849 (Database Migration Performance Optimization - In Progress, 8 pts). Focus: improving migration performance by 50%, optimizing for 10M+ member records."
     else:
-        return f"This is the LoyaltyAI demo system with realistic Optum team data. The complete team roster includes: Taj Mahal team (Rishab Bhat, Britney Duratinsky, Scott Forsmann), Machu Picchu team (Sofia Khan, Ravali Botta, Michael Joyce, Shasikumar Bommineni, Ganesh Nettem, Nagarjuna Reddy, Ajit Krishnan), and leadership (Allesha Fogle, Christopher Jimenez, Connie Cavallo, Swapna Kolimi). All information is part of the demonstration dataset."
+        return f"Your work assignments are visible in your individual dashboard. Current sprint focus varies by team role."
 
-def generate_answer_with_ai(question: str, context: str, client, user_info) -> str:
-    """Generate answer using AI API or demo responses"""
-    if not client:
-        # Enhanced demo mode responses when no API key
-        demo_responses = {
-            "who's on call": "Scott Forsmann is on call this week (Jan 20-26). You can reach him at 612-555-0134.",
-            "taj mahal team": "The Taj Mahal team includes Rishab Bhat, Britney Duratinsky, and Scott Forsmann, all Associate Software Engineers managed by Allesha Fogle.",
-            "machu picchu team": "The Machu Picchu team includes Sofia Khan, Ravali Botta, Michael Joyce (Senior Engineer/Lead), Shasikumar Bommineni, Ganesh Nettem, Nagarjuna Reddy, and Ajit Krishnan.",
-            "my team": f"You're on the {user_info.get('team', 'Unknown')} team. Check your dashboard for current team composition and projects.",
-            "sprint goals": "Sprint 23 focuses on Kafka migration (Britney), Source System Ranking (Rishab), database optimization (Scott), and device sync improvements.",
-            "tech stack": "Our tech stack: Java Spring Boot, MySQL, Kubernetes, Apache Kafka, Splunk, React, and Capillary Technologies frontend.",
-            "database issues": "For database issues, contact dba-team@optum.com or escalate to Maria Garcia for urgent problems.",
-            "my work": f"Hi {user_info.get('name', 'there')}! Your current work assignments are shown in your dashboard. This demo includes realistic project data for the Loyalty platform.",
-            "kafka migration": "Britney Duratinsky is leading the Kafka migration to replace the legacy Top of Funnel Perl script. Currently 70% complete."
-        }
-        
-        question_lower = question.lower()
-        for key, response in demo_responses.items():
-            if any(word in question_lower for word in key.split()):
-                return response
-        
-        # Check if context indicates unknown person
-        if "don't have information about" in context:
-            return context
-        
-        return f"Hi {user_info.get('name', 'there')}! This is the LoyaltyAI demo with realistic Optum team data. All names and projects are part of the demonstration dataset. The AI would provide detailed answers about your team's work, including specific names and project details, since this is a controlled demo environment."
+@st.cache_resource
+def get_doc_indexes():
+    """Open the BM25 index and vector store over docs/, re-indexing only changed files"""
+    vector_store = doc_index.open_vector_store()
+    summary = doc_index.sync_index(vector_store=vector_store)
+    logger.info(f"Document index sync: {summary}")
+    return doc_index.BM25Index(), vector_store
+
+@st.cache_resource
+def doc_index_version() -> str:
+    """Digest of the indexed docs/ files; the index is only re-synced at start-up"""
+    manifest = get_doc_indexes()[0].manifest()
+    digest = hashlib.sha256()
+    for path in sorted(manifest):
+        digest.update(f"{path}\x1f{manifest[path][2]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+@st.cache_resource
+def get_retrieval_pool():
+    """Shared worker pool so lexical and vector search run side by side"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """Merge ranked passage lists by summing 1 / (k + rank) per passage id"""
+    scores = {}
+    passages = {}
+    for ranking in rankings:
+        for rank, passage in enumerate(ranking, start=1):
+            scores[passage["id"]] = scores.get(passage["id"], 0.0) + 1.0 / (k + rank)
+            passages.setdefault(passage["id"], passage)
+    return [passages[chunk_id] for chunk_id in sorted(scores, key=scores.get, reverse=True)]
+
+def search_docs(question: str, k: int = DOC_SEARCH_TOP_K) -> list:
+    """Run BM25 and vector search concurrently over docs/ and fuse the rankings"""
+    try:
+        with RETRIEVAL_SECONDS.time():
+            index, vector_store = get_doc_indexes()
+            pool = get_retrieval_pool()
+            searches = [pool.submit(index.search, question, k)]
+            if vector_store is not None:
+                searches.append(pool.submit(vector_store.search, question, k, VECTOR_MIN_SIMILARITY))
+            rankings = [search.result() for search in searches]
+    except Exception as e:
+        logger.error(f"Document search failed: {e}")
+        return []
+    return reciprocal_rank_fusion(rankings)
+
+def pack_context_blocks(pinned: list, passages: list, budget: int = CONTEXT_TOKEN_BUDGET) -> list:
+    """Pinned blocks always go first; fused passages fill whatever budget remains"""
+    blocks = list(pinned)
+    used = sum(estimate_tokens(block) for block in blocks)
+    for passage in passages:
+        block = f"From {passage['path']} ({passage['title']}):\n{passage['text']}"
+        cost = estimate_tokens(block)
+        if used + cost > budget:
+            continue
+        blocks.append(block)
+        used += cost
+    return blocks
+
+@CONTEXT_SECONDS.time()
+def get_relevant_context(question: str, user_info: dict, trace: dict = None) -> str:
+    """Get context based on question keywords - enhanced with user-specific data.
+
+    The question is routed to an intent once per turn, here; the intent is
+    left in trace for the answer, cost attribution and request log.
+    """
+    question_lower = question.lower()
+    with INTENT_ROUTING_SECONDS.time():
+        intent = match_intent(question_lower, user_info)
+    if trace is not None:
+        trace["intent"] = intent
+    
+    # Extract potential names from the question to check against our database
+    potential_names = []
+    words = question_lower.split()
+    for i, word in enumerate(words):
+        if word in ['who', 'whos', "who's"] and i + 1 < len(words):
+            potential_names.append(words[i + 1])
+        elif word in ['about', 'find', 'tell'] and i + 1 < len(words):
+            potential_names.append(words[i + 1])
+    
+    # Check if asking about someone not in our team database
+    known_people = ['rishab', 'britney', 'scott', 'michael', 'sofia', 'ravali', 'allesha', 'christopher', 'connie', 'swapna', 'shasikumar', 'ganesh', 'nagarjuna', 'ajit']
+    for name in potential_names:
+        clean_name = name.lower().strip('.,?!')
+        # Intent vocabulary ("whos oncall") is not someone's name
+        if clean_name not in known_people and clean_name not in INTENT_WORDS and len(clean_name) > 2:
+            return f"I don't have information about '{name}' in our current team database. The people I know about include the Taj Mahal team (Rishab Bhat, Britney Duratinsky, Scott Forsmann), Machu Picchu team (Sofia Khan, Ravali Botta, Michael Joyce, and contractors), and leadership team (Allesha Fogle, Christopher Jimenez). Could you be thinking of one of these team members?"
     
-    # Real AI response with API key
-    role_context = f"You are LoyaltyAI, an internal team assistant for the Optum Loyalty platform. You're responding to {user_info.get('name', 'a team member')}, a {user_info.get('role', 'team member')} on the {user_info.get('team', 'Unknown')} team."
+    # Hardcoded intent context is pinned ahead of anything retrieved from docs/
+    pinned = []
+    if intent == "my_work":
+        pinned.append(get_my_work_context(user_info))
+    elif intent:
+        pinned.append(INTENT_CONTEXTS[intent])
     
-    prompt = f"""{role_context}
+    blocks = pack_context_blocks(pinned, search_docs(question))
+    if blocks:
+        return CONTEXT_SEPARATOR.join(blocks)
+    
+    return TEAM_ROSTER
 
-IMPORTANT: This is a demonstration application with fictional team data. You must ONLY use information provided in the context below. DO NOT make up or invent any names, people, projects, or details that are not explicitly mentioned in the context.
+def normalize_context_block(block: str) -> str:
+    """Dedent a context block and squeeze redundant whitespace"""
+    lines = [line.rstrip() for line in inspect.cleandoc(block).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def pack_prompt_context(context: str, budget: int, known: str = "") -> str:
+    """Normalize, deduplicate and trim ranked context blocks to a token budget"""
+    kept = []
+    used = 0
+    for block in context.split(CONTEXT_SEPARATOR):
+        block = normalize_context_block(block)
+        # Skip empty blocks and blocks already covered by known text or a higher-ranked block
+        if not block or block in known or any(block in previous for previous in kept):
+            continue
+        cost = estimate_tokens(block)
+        if used + cost > budget:
+            if not kept:
+                # The top-ranked block is always sent, cut down to the whole lines that fit
+                lines = []
+                for line in block.splitlines():
+                    if estimate_tokens("\n".join(lines + [line])) > budget:
+                        break
+                    lines.append(line)
+                kept.append("\n".join(lines))
+            break
+        kept.append(block)
+        used += cost
+    return CONTEXT_SEPARATOR.join(kept)
+
+@st.cache_data
+def team_reference(role: str, team: str) -> str:
+    """The roster and every pinned intent context this role and team may see, identical for all their questions"""
+    blocks = [TEAM_ROSTER]
+    for intent, _, allowed_roles, required_team in INTENT_RULES:
+        if intent == "my_work":
+            continue
+        if allowed_roles is not None and role not in allowed_roles:
+            continue
+        if required_team is not None and team != required_team:
+            continue
+        blocks.append(normalize_context_block(INTENT_CONTEXTS[intent]))
+    return CONTEXT_SEPARATOR.join(blocks)
 
-If someone asks about a person or information not in the context, clearly state that you don't have that information in your database and suggest they might be thinking of someone else from the known team members.
+def build_prompt(question: str, context: str, user_info: dict, conversation: dict = None, model: str = None) -> dict:
+    """Assemble system and messages request params, fitting the context into the role's input-token budget.
 
-Context about the team: {context}
+    The prompt is ordered from most to least reusable so the prompt cache can
+    serve the prefix: static instructions and the team reference for the
+    asker's role and team, with a single breakpoint after them, then who is
+    asking, the passages retrieved for this question, a follow-up question's
+    conversation summary and recent turns, and the question itself. The
+    breakpoint is only set when the prefix reaches the model's minimum
+    cacheable length; shorter prefixes are never cached. The input-token
+    budget covers everything after the breakpoint.
 
-User question: {question}
+    Standalone answers are shared through the answer cache between askers
+    with the same role and team, so only follow-ups name the asker.
+    """
+    asker = f"{user_info.get('name', 'a team member')}, a" if conversation else "a"
+    role_context = f"You're responding to {asker} {user_info.get('role', 'team member')} on the {user_info.get('team', 'Unknown')} team."
+    question_text = f"""User question: {question}
 
 Provide a direct, helpful answer using ONLY the information in the context. Do not invent or hallucinate any details not provided."""
+    
+    conversation = conversation or {}
+    summary = conversation.get("summary")
+    history = conversation.get("history", [])
+    
+    reference = team_reference(user_info.get('role', ''), user_info.get('team', ''))
+    budget = INPUT_TOKEN_BUDGETS.get(user_info.get('dashboard_type'), DEFAULT_INPUT_TOKEN_BUDGET)
+    overhead = estimate_tokens(role_context) + estimate_tokens(question_text)
+    overhead += sum(estimate_tokens(message["content"]) for message in history) + (estimate_tokens(summary) if summary else 0)
+    # Pinned blocks already in the team reference are not repeated
+    packed_context = pack_prompt_context(context, budget - overhead, known=reference)
+    shared = f"{SYSTEM_INSTRUCTIONS}\n\nReference about the team:\n\n{reference}"
+    system = [{"type": "text", "text": shared}]
+    if estimate_tokens(shared) >= prompt_cache_min_tokens(model or MODEL_PARAMS["model"]):
+        system[0]["cache_control"] = {"type": "ephemeral"}
+    system.append({"type": "text", "text": role_context})
+    if packed_context:
+        system.append({"type": "text", "text": f"Context for this question: {packed_context}"})
+    if summary:
+        system.append({"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"})
+    return {
+        "system": system,
+        "messages": history + [{"role": "user", "content": question_text}],
+    }
+
+@st.cache_resource
+def get_usage_totals() -> dict:
+    """Token usage summed over every model call in this server process"""
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+
+def record_usage(usage) -> dict:
+    """Log a response's token usage, including prompt cache reads and writes, and add it to the totals"""
+    counts = {key: getattr(usage, key, None) or 0 for key in ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")}
+    logger.info(
+        f"AI usage: input={counts['input_tokens']} output={counts['output_tokens']} "
+        f"cache_read={counts['cache_read_input_tokens']} cache_write={counts['cache_creation_input_tokens']}"
+    )
+    totals = get_usage_totals()
+    totals["calls"] += 1
+    for key, value in counts.items():
+        totals[key] += value
+        MODEL_TOKENS.inc(value, type=key.replace("_tokens", ""))
+    return counts
+
+@st.cache_resource
+def get_usage_ledger():
+    """Per-user, per-dashboard and per-intent token and cost totals shared by all sessions"""
+    return UsageLedger()
+
+def charge_usage(counts: dict, params: dict, user_info: dict, intent: str = None) -> float:
+    """Attribute one call's usage to its asker, dashboard type and intent; returns the cost in USD"""
+    intent = intent or "none"
+    dashboard_type = user_info.get("dashboard_type", "unknown")
+    cost = get_usage_ledger().record(user_info.get("name", "unknown"), dashboard_type, intent, params["model"], counts)
+    profile = "economy" if params is ECONOMY_MODEL_PARAMS else "standard"
+    MODEL_COST.inc(cost, dashboard_type=dashboard_type, intent=intent, profile=profile)
+    return cost
+
+def record_discarded_usage(model: str, usage):
+    """Account for a hedged request that lost the race: its tokens are billed though its answer is unused"""
+    counts = record_usage(usage)
+    cost = get_usage_ledger().record("(hedge)", "unknown", "hedge", model, counts)
+    profile = "economy" if model == ECONOMY_MODEL_PARAMS["model"] else "standard"
+    MODEL_COST.inc(cost, dashboard_type="unknown", intent="hedge", profile=profile)
+
+def model_params_for(user_info: dict) -> dict:
+    """The generation profile for this asker: economy once their dashboard type is over budget"""
+    if not COST_BUDGETS_ENABLED:
+        return MODEL_PARAMS
+    dashboard_type = user_info.get("dashboard_type")
+    budget = COST_BUDGETS.get(dashboard_type)
+    if budget is None:
+        return MODEL_PARAMS
+    if get_usage_ledger().spend("dashboard_type", dashboard_type, COST_BUDGET_WINDOW_SECONDS) >= budget:
+        return ECONOMY_MODEL_PARAMS
+    return MODEL_PARAMS
+
+def build_conversation(question: str, messages: list, summary: str):
+    """Multi-turn context for a follow-up question: the rolling summary and recent turns; None for standalone questions"""
+    if not (messages or summary) or not is_follow_up(question):
+        return None
+    return {"summary": summary, "history": recent_turns(messages, CONVERSATION_CONTEXT_TURNS, CONVERSATION_CONTEXT_TOKENS)}
+
+def summarize_conversation(previous: str, messages: list, client, user_info: dict) -> str:
+    """Fold messages into the rolling summary, with the model when available, else extractively"""
+    if client:
+        try:
+            new_turns = f"Earlier summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript(messages)}"
+            with MODEL_CALL_SECONDS.time(call="summary"):
+                response = client.messages.create(
+                    model=MODEL_PARAMS["model"],
+                    max_tokens=CONVERSATION_SUMMARY_TOKENS,
+                    system=SUMMARY_INSTRUCTIONS,
+                    messages=[{"role": "user", "content": new_turns}],
+                )
+            charge_usage(record_usage(response.usage), MODEL_PARAMS, user_info, intent="conversation_summary")
+            return response.content[0].text.strip()
+        except Exception as e:
+            logger.warning(f"Model summary failed, summarizing extractively: {e}")
+    return extractive_summary(previous, messages, CONVERSATION_SUMMARY_TOKENS)
+
+def compact_conversation(client, user_info: dict):
+    """Keep the session's messages under the cap by folding the oldest into the rolling summary"""
+    messages = st.session_state.messages
+    fold = compaction_split(messages, CONVERSATION_MAX_MESSAGES)
+    if not fold:
+        return
+    folded = messages[:fold]
+    del messages[:fold]
+    st.session_state.conversation_summary = summarize_conversation(
+        st.session_state.get("conversation_summary", ""), folded, client, user_info
+    )
+
+@st.cache_resource
+def get_answer_cache():
+    """Answer cache shared by all sessions, or None when disabled"""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    return AnswerCache(
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold=ANSWER_CACHE_SIMILARITY,
+    )
+
+@st.cache_resource
+def get_request_log():
+    """Chat turn log shared by all sessions, or None when disabled"""
+    if not REQUEST_LOG_ENABLED:
+        return None
+    return RequestLog(REQUEST_LOG_PATH, flush_interval=REQUEST_LOG_FLUSH_INTERVAL)
+
+def log_chat_turn(question: str, context: str, user_info: dict, trace: dict, latency: float):
+    """Queue one chat turn for the request log"""
+    request_log = get_request_log()
+    if request_log is None:
+        return
+    request_log.append({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "role": user_info.get("role"),
+        "team": user_info.get("team"),
+        "dashboard_type": user_info.get("dashboard_type"),
+        "question": question,
+        "context_chars": len(context),
+        "context_tokens": estimate_tokens(context),
+        "latency_ms": round(latency * 1000, 1),
+        **trace,
+    })
+
+@st.cache_resource
+def get_inflight_calls():
+    """Registry of model calls in flight, shared by all sessions to coalesce identical questions"""
+    return SingleFlight()
+
+def answer_cache_role(user_info: dict) -> str:
+    """Cached answers are shared between askers with the same role and team; their prompts carry nothing more personal"""
+    return f"{user_info.get('role', '')}|{user_info.get('team', '')}"
+
+def answer_cache_paraphrase(question: str, context: str, user_info: dict, intent: str = None) -> dict:
+    """Paraphrase scope for a routed question: its intent, pinned context and the docs version.
+
+    Retrieved passages follow the question's wording, so paraphrases of one
+    intent are matched on the words left once the intent's phrases are
+    removed ("whos oncall this week" and "who is on call" both reduce to the
+    intent alone). Unrouted questions keep the full context as their scope.
+    """
+    if intent is None:
+        return {}
+    pinned = get_my_work_context(user_info) if intent == "my_work" else INTENT_CONTEXTS[intent]
+    if not context.startswith(pinned):
+        return {}
+    remainder = normalize_question(question)
+    for phrase in INTENT_PHRASES[intent]:
+        remainder = remainder.replace(phrase, " ")
+    return {
+        "anchor": f"{intent}\x1f{pinned}\x1f{doc_index_version()}",
+        # Nothing left but filler words: the question is the intent itself
+        "match_text": remainder if question_shingles(remainder) else intent,
+    }
+
+def answer_call_key(question: str, context: str, role: str, params: dict, conversation: dict = None) -> str:
+    """Key under which identical in-flight model calls are shared"""
+    key = make_cache_key(question, context, role, params)
+    return f"{key}:{conversation_digest(conversation)}" if conversation else key
+
+def generate_answer_with_ai(question: str, context: str, client, user_info, trace: dict = None, conversation: dict = None) -> str:
+    """Generate answer using AI API or demo responses; details of the call are added to trace if given"""
+    trace = {} if trace is None else trace
+    if not client:
+        trace.update(mode="demo", cache="bypass")
+        with ANSWER_SECONDS.time(mode="demo"):
+            return generate_demo_answer(question, context, user_info)
+    trace["mode"] = "live"
+    with ANSWER_SECONDS.time(mode="live"):
+        return generate_live_answer(question, context, client, user_info, trace, conversation)
+
+def generate_demo_answer(question: str, context: str, user_info) -> str:
+    """Canned answers for demo mode, when there is no API key or the API is unavailable"""
+    # Enhanced demo mode responses when no API key
+    demo_responses = {
+        "who's on call": "Scott Forsmann is on call this week (Jan 20-26). You can reach him at 612-555-0134.",
+        "taj mahal team": "The Taj Mahal team includes Rishab Bhat, Britney Duratinsky, and Scott Forsmann, all Associate Software Engineers managed by Allesha Fogle.",
+        "machu picchu team": "The Machu Picchu team includes Sofia Khan, Ravali Botta, Michael Joyce (Senior Engineer/Lead), Shasikumar Bommineni, Ganesh Nettem, Nagarjuna Reddy, and Ajit Krishnan.",
+        "my team": f"You're on the {user_info.get('team', 'Unknown')} team. Check your dashboard for current team composition and projects.",
+        "sprint goals": "Sprint 23 focuses on Kafka migration (Britney), Source System Ranking (Rishab), database optimization (Scott), and device sync improvements.",
+        "tech stack": "Our tech stack: Java Spring Boot, MySQL, Kubernetes, Apache Kafka, Splunk, React, and Capillary Technologies frontend.",
+        "database issues": "For database issues, contact dba-team@optum.com or escalate to Maria Garcia for urgent problems.",
+        "my work": f"Hi {user_info.get('name', 'there')}! Your current work assignments are shown in your dashboard. This demo includes realistic project data for the Loyalty platform.",
+        "kafka migration": "Britney Duratinsky is leading the Kafka migration to replace the legacy Top of Funnel Perl script. Currently 70% complete."
+    }
+    
+    question_lower = question.lower()
+    for key, response in demo_responses.items():
+        if any(word in question_lower for word in key.split()):
+            return response
+    
+    # Check if context indicates unknown person
+    if "don't have information about" in context:
+        return context
+    
+    return f"Hi {user_info.get('name', 'there')}! This is the LoyaltyAI demo with realistic Optum team data. All names and projects are part of the demonstration dataset. The AI would provide detailed answers about your team's work, including specific names and project details, since this is a controlled demo environment."
+
+def generate_live_answer(question: str, context: str, client, user_info, trace: dict, conversation: dict = None) -> str:
+    """Answer with the model, reusing cached and in-flight answers"""
+    # Real AI response with API key, unless the same question (or a close paraphrase) was answered recently
+    params = model_params_for(user_info)
+    trace["model"] = params["model"]
+    # Follow-up answers depend on this conversation, so they are neither cached nor shared
+    cache = None if conversation else get_answer_cache()
+    trace["follow_up"] = conversation is not None
+    role = answer_cache_role(user_info)
+    paraphrase = answer_cache_paraphrase(question, context, user_info, trace.get("intent")) if cache else {}
+    if cache:
+        cached = cache.lookup(question, context, role, params, **paraphrase)
+        if cached is not None:
+            trace["cache"] = "hit"
+            return cached
+
+    def ask():
+        trace["cache"] = "miss"
+        with MODEL_CALL_SECONDS.time(call="create"):
+            started = time.perf_counter()
+            response = client.messages.create(**params, **build_prompt(question, context, user_info, conversation, params["model"]))
+            trace["model_latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        trace["usage"] = record_usage(response.usage)
+        trace["cost_usd"] = charge_usage(trace["usage"], params, user_info, trace.get("intent"))
+        answer = response.content[0].text
+        if cache:
+            cache.store(question, context, role, params, answer, **paraphrase)
+        return answer
 
     try:
-        response = client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=800,
-            temperature=0.1,  # Lower temperature to reduce hallucination
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text
+        # Concurrent askers of the same question share one call; only the one that makes it runs ask()
+        trace["cache"] = "coalesced"
+        return get_inflight_calls().do(answer_call_key(question, context, role, params, conversation), ask)
+    except CircuitOpenError:
+        # Upstream is unhealthy; answer from the demo path instead of waiting on it
+        trace["error"] = "circuit_open"
+        return generate_answer_with_ai(question, context, None, user_info)
     except Exception as e:
+        MODEL_ERRORS.inc(call="create")
+        trace["error"] = type(e).__name__
         return f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again in a moment."
 
+def stream_answer_with_ai(question: str, context: str, client, user_info, trace: dict = None, conversation: dict = None):
+    """Yield the answer text incrementally as the model produces it; details of the call are added to trace if given.
+
+    If the stream fails after some text was yielded, STREAM_RESET is yielded
+    before the fallback answer, so the partial text is replaced rather than
+    kept as part of the answer.
+    """
+    trace = {} if trace is None else trace
+    if not client:
+        # Demo answers are local, so there is nothing to stream
+        yield generate_answer_with_ai(question, context, client, user_info, trace)
+        return
+    trace.update(mode="live", streamed=True)
+    with ANSWER_SECONDS.time(mode="live"):
+        yield from stream_live_answer(question, context, client, user_info, trace, conversation)
+
+def stream_live_answer(question: str, context: str, client, user_info, trace: dict, conversation: dict = None):
+    """Stream the model's answer, reusing cached and in-flight answers"""
+    params = model_params_for(user_info)
+    trace["model"] = params["model"]
+    # Follow-up answers depend on this conversation, so they are neither cached nor shared
+    cache = None if conversation else get_answer_cache()
+    trace["follow_up"] = conversation is not None
+    role = answer_cache_role(user_info)
+    paraphrase = answer_cache_paraphrase(question, context, user_info, trace.get("intent")) if cache else {}
+    if cache:
+        cached = cache.lookup(question, context, role, params, **paraphrase)
+        if cached is not None:
+            trace["cache"] = "hit"
+            yield cached
+            return
+    
+    inflight = get_inflight_calls()
+    key = answer_call_key(question, context, role, params, conversation)
+    future, leader = inflight.claim(key)
+    if not leader:
+        # The same question is already being answered for someone else; wait for that answer
+        logger.info("Coalesced streaming request with an identical in-flight call")
+        trace["cache"] = "coalesced"
+        try:
+            yield future.result()
+        except CircuitOpenError:
+            trace["error"] = "circuit_open"
+            yield generate_answer_with_ai(question, context, None, user_info)
+        except Exception as e:
+            MODEL_ERRORS.inc(call="stream")
+            trace["error"] = type(e).__name__
+            logger.error(f"Shared streaming response failed: {e}")
+            yield f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again in a moment."
+        return
+    
+    trace["cache"] = "miss"
+    prompt = build_prompt(question, context, user_info, conversation, params["model"])
+    answer = error = None
+    parts = []
+    try:
+        with MODEL_CALL_SECONDS.time(call="stream"):
+            started = time.perf_counter()
+            with client.messages.stream(**params, **prompt) as stream:
+                for text in stream.text_stream:
+                    if not parts:
+                        first_token = time.perf_counter() - started
+                        MODEL_FIRST_TOKEN_SECONDS.observe(first_token)
+                        trace["first_token_ms"] = round(first_token * 1000, 1)
+                    parts.append(text)
+                    yield text
+                trace["usage"] = record_usage(stream.get_final_message().usage)
+                trace["cost_usd"] = charge_usage(trace["usage"], params, user_info, trace.get("intent"))
+            trace["model_latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        answer = "".join(parts)
+        # Only complete answers are cached
+        if cache:
+            cache.store(question, context, role, params, answer, **paraphrase)
+    except Exception as e:
+        error = e
+    finally:
+        # Waiting callers get the same outcome, including when this stream is abandoned midway
+        if answer is not None:
+            inflight.resolve(key, answer)
+        else:
+            inflight.resolve(key, error=error or RuntimeError("Streaming answer was abandoned"))
+    if error and parts:
+        trace["truncated"] = True
+        yield STREAM_RESET
+    if isinstance(error, CircuitOpenError):
+        trace["error"] = "circuit_open"
+        yield generate_answer_with_ai(question, context, None, user_info)
+    elif error:
+        MODEL_ERRORS.inc(call="stream")
+        trace["error"] = type(error).__name__
+        logger.error(f"Streaming response failed: {error}")
+        yield f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again in a moment."
+
+def render_usage_summary():
+    """Sidebar breakdown of model spend over the budget window, heaviest first"""
+    ledger = get_usage_ledger()
+    minutes = COST_BUDGET_WINDOW_SECONDS / 60
+    with st.expander(f"💸 AI spend (last {minutes:.0f} min)"):
+        for group_by, label in (("dashboard_type", "Dashboard"), ("intent", "Intent")):
+            totals = ledger.totals(group_by, COST_BUDGET_WINDOW_SECONDS)
+            if not totals:
+                st.caption("No model calls yet")
+                return
+            st.markdown(f"**By {label.lower()}**")
+            for name, row in sorted(totals.items(), key=lambda item: item[1]["cost_usd"], reverse=True)[:5]:
+                tokens = row["input_tokens"] + row["output_tokens"] + row["cache_read_input_tokens"] + row["cache_creation_input_tokens"]
+                st.caption(f"{name.replace('_', ' ')}: ${row['cost_usd']:.4f} · {row['calls']} calls · {tokens:,} tokens")
+
+def show_earlier_messages():
+    """Button callback: reveal one more page of chat history"""
+    st.session_state.chat_history_shown += CHAT_HISTORY_PAGE
+
+def render_chat_history(messages: list, summary: str = ""):
+    """Render only the most recent window of the conversation, with paging for older messages"""
+    if "chat_history_shown" not in st.session_state:
+        st.session_state.chat_history_shown = CHAT_HISTORY_WINDOW
+    hidden = max(0, len(messages) - st.session_state.chat_history_shown)
+    if hidden:
+        st.button(f"⬆️ Load earlier messages ({hidden} hidden)", on_click=show_earlier_messages)
+    elif summary:
+        with st.expander("🗂️ Earlier conversation (summarized)"):
+            st.markdown(summary)
+    for message in messages[hidden:]:
+        with st.chat_message(message["role"], avatar="🤖" if message["role"] == "assistant" else "👤"):
+            st.markdown(message["content"])
+
+def dashboard_snapshot(dashboard_type: str):
+    """(data, version stamp) of one dashboard type, read together so a render never mixes two versions"""
+    return get_data_store().snapshot(f"dashboards/{dashboard_type}")
+
+def card_html(card_class: str, body: str) -> str:
+    return f'<div class="{card_class}">{body}</div>'
+
+def section_html(title: str, cards: list) -> str:
+    """A markdown heading and its cards, sent as one element"""
+    return "\n\n".join([f"#### {title}"] + cards)
+
+def compile_individual_dashboard(section: dict, username: str) -> dict:
+    user_data = section.get(username, section["rishab"])
+    stories = []
+    for story in user_data["my_stories"]:
+        card_class = "dashboard-card-success" if story['status'] == 'Code Review' else "dashboard-card-alt" if story['status'] == 'In Progress' else "dashboard-card"
+        details = [f"**Status:** {story['status']}", f"**Description:** {story['description']}", "**Acceptance Criteria:**"]
+        details += [f"• {criteria}" for criteria in story['acceptance_criteria']]
+        details.append("**Tasks:**")
+        for task in story['tasks']:
+            status_emoji = "✅" if task['status'] == 'Complete' else "🔄" if task['status'] == 'In Progress' else "📋"
+            details.append(f"{status_emoji} {task['task']} - *{task['status']}*")
+        stories.append((
+            f"🎯 {story['id']} - {story['title']} ({story['points']} pts)",
+            "\n\n".join(details),
+            card_html(card_class, f'<strong>{story["id"]}</strong> - {story["title"]}<br><span class="status-badge">{story["status"]}</span> <span style="float: right; font-size: 1.2em; font-weight: bold;">{story["points"]} pts</span>'),
+        ))
+    
+    on_call = []
+    for schedule in section["on_call_schedule"]:
+        card_class = "dashboard-card-danger" if 'Current' in schedule['week'] else "dashboard-card"
+        on_call.append(card_html(card_class, f'<strong>{schedule["week"]}</strong><br>{schedule["engineer"]}<br>📞 {schedule["phone"]}'))
+    incidents = []
+    for incident in section["my_incidents"]:
+        priority_class = "dashboard-card-danger" if incident['priority'] == 'P1' else "dashboard-card-alt" if incident['priority'] == 'P2' else "dashboard-card"
+        incidents.append(card_html(priority_class, f'<strong>{incident["id"]}</strong><br>{incident["title"]}<br><span class="status-badge">{incident["priority"]} - {incident["status"]}</span>'))
+    side = section_html("📅 On-Call Schedule", on_call) + "\n\n" + section_html("🚨 Recent Incidents", incidents)
+    return {"stories": stories, "side": side}
+
+def compile_senior_engineer_dashboard(section: dict, username: str) -> dict:
+    metrics = section["team_metrics"]
+    metric_cards = [
+        card_html("dashboard-card-success", f'<div class="metric-number">{metrics["sprint_velocity"]}</div><strong>Sprint Velocity</strong><br><small>{metrics["velocity_trend"]}</small>'),
+        card_html("dashboard-card-alt", f'<div class="metric-number">{metrics["code_coverage"]}%</div><strong>Code Coverage</strong><br><small>{metrics["coverage_trend"]}</small>'),
+        card_html("dashboard-card", f'<div class="metric-number">{metrics["bug_escape_rate"]}</div><strong>Bug Escape Rate</strong>'),
+        card_html("dashboard-card", f'<div class="metric-number">{metrics["avg_cycle_time"]}</div><strong>Avg Cycle Time</strong>'),
+    ]
+    members = []
+    for member in section["team_members"]:
+        card_class = "dashboard-card-success" if member['status'] == 'On Track' else "dashboard-card-alt" if member['status'] == 'Ahead' else "dashboard-card"
+        members.append(card_html(card_class, f'<strong>{member["name"]}</strong> - {member["role"]}<br>{member["current_task"]}<br><span class="status-badge">{member["status"]}</span> | Load: {member["current_sprint_load"]}'))
+    reviews = []
+    for pr in section["priority_code_reviews"]:
+        card_class = "dashboard-card-danger" if pr['urgency'] == 'Critical' else "dashboard-card-alt" if pr['urgency'] == 'Medium' else "dashboard-card"
+        reviews.append(card_html(card_class, f'<strong>{pr["pr"]}</strong> - {pr["title"]}<br>By: {pr["author"]} | {pr["complexity"]} complexity<br><span class="status-badge">{pr["status"]}</span>'))
+    return {
+        "metrics": metric_cards,
+        "columns": [section_html("👥 Team Members", members), section_html("🔍 Priority Code Reviews", reviews)],
+    }
+
+def compile_director_dashboard(section: dict, username: str) -> dict:
+    teams = []
+    for team, data in section["team_burndown"].items():
+        card_class = "dashboard-card-success" if data['velocity'] == 'Ahead' else "dashboard-card-danger" if data['velocity'] == 'At Risk' else "dashboard-card-alt"
+        completion_pct = round((data['completed'] / data['planned']) * 100)
+        teams.append(card_html(card_class, f'<strong>{team.replace("_", " ").title()}</strong><br>Progress: {data["completed"]}/{data["planned"]} ({completion_pct}%)<br><span class="status-badge">{data["velocity"]}</span> | Satisfaction: {data["satisfaction"]}/5.0<br>Blockers: {data["blockers"]}'))
+    initiatives = []
+    for initiative in section["strategic_initiatives"]:
+        card_class = "dashboard-card-success" if initiative['status'] == 'On Track' else "dashboard-card" if initiative['status'] == 'Planning' else "dashboard-card-alt"
+        initiatives.append(card_html(card_class, f'<strong>{initiative["name"]}</strong><br>Progress: {initiative["completion"]}%<br><span class="status-badge">{initiative["status"]}</span><br><small>{initiative["budget"]} | {initiative["timeline"]}</small>'))
+    risks = []
+    for risk in section["risk_register"]:
+        risk_class = "dashboard-card-danger" if risk['impact'] == 'High' and risk['probability'] == 'Medium' else "dashboard-card-alt"
+        risks.append(card_html(risk_class, f'<strong>{risk["risk"]}</strong><br>Impact: {risk["impact"]} | Probability: {risk["probability"]}<br><span class="status-badge">{risk["status"]}</span>'))
+    hiring = []
+    for hire in section["hiring_pipeline"]:
+        hire_class = "dashboard-card-success" if hire['stage'] == 'Offer Extended' else "dashboard-card-alt"
+        hiring.append(card_html(hire_class, f'<strong>{hire["position"]}</strong><br>{hire["team"]} Team | {hire["candidates"]} candidates<br><span class="status-badge">{hire["stage"]}</span><br><small>Target: {hire["hire_date"]}</small>'))
+    return {
+        "rows": [
+            [section_html("📊 Team Performance", teams), section_html("🎯 Strategic Initiatives", initiatives)],
+            [section_html("⚠️ Risk Register", risks), section_html("👔 Hiring Pipeline", hiring)],
+        ],
+    }
+
+def compile_engineering_manager_dashboard(section: dict, username: str) -> dict:
+    reports = []
+    for report in section["direct_reports"]:
+        card_class = "dashboard-card-success" if report['performance'] == 'Exceeds Expectations' else "dashboard-card-alt"
+        reports.append(card_html(card_class, f'<strong>{report["name"]}</strong><br>{report["role"]} - {report["team"]}<br><span class="status-badge">{report["performance"]}</span><br>Load: {report["current_sprint_load"]} | Experience: {report["years_experience"]}y'))
+    teams = []
+    for team, perf in section["team_performance"].items():
+        efficiency_pct = perf['efficiency'].replace('%', '')
+        card_class = "dashboard-card-success" if int(efficiency_pct) >= 90 else "dashboard-card-alt"
+        teams.append(card_html(card_class, f'<strong>{team.replace("_", " ").title()}</strong><br>Velocity: {perf["velocity"]}/{perf["target"]} | Efficiency: {perf["efficiency"]}<br>Satisfaction: {perf["satisfaction"]}/5.0<br>Issues: {perf["issues"]}'))
+    return {"columns": [section_html("👥 Direct Reports", reports), section_html("📈 Team Performance", teams)]}
+
+def compile_product_manager_dashboard(section: dict, username: str) -> dict:
+    epics = []
+    for epic in section["active_epics"]:
+        card_class = "dashboard-card-success" if epic['status'] == 'On Track' else "dashboard-card-danger" if epic['status'] == 'At Risk' else "dashboard-card"
+        epics.append(card_html(card_class, f'<strong>{epic["epic"]}</strong> - {epic["title"]}<br>Progress: {epic["progress"]}% | Target: {epic["target_date"]}<br><span class="status-badge">{epic["status"]}</span><br><small>{epic["business_value"]} | Risk: {epic["risk_level"]}</small>'))
+    return {"body": section_html("🎯 Active Epics", epics)}
+
+def compile_scrum_master_dashboard(section: dict, username: str) -> dict:
+    teams = []
+    for team, health in section["team_health"].items():
+        card_class = "dashboard-card-success" if health['satisfaction'] >= 4.0 and health['blockers'] <= 1 else "dashboard-card-alt"
+        teams.append(card_html(card_class, f'<strong>{team.replace("_", " ").title()}</strong><br>Satisfaction: {health["satisfaction"]}/5.0 | Capacity: {health["capacity"]}<br>Blockers: {health["blockers"]} | Goal Achievement: {health["sprint_goal_achievement"]}<br>Team Size: {health["team_size"]} | Trend: {health["velocity_trend"]}'))
+    return {"body": section_html("📈 Team Health Overview", teams)}
+
+DASHBOARD_COMPILERS = {
+    "individual": compile_individual_dashboard,
+    "senior_engineer": compile_senior_engineer_dashboard,
+    "director": compile_director_dashboard,
+    "engineering_manager": compile_engineering_manager_dashboard,
+    "product_manager": compile_product_manager_dashboard,
+    "scrum_master": compile_scrum_master_dashboard,
+}
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def compile_dashboard(dashboard_type: str, username: str, data_version: str, _data: dict) -> dict:
+    """HTML blocks for one dashboard, cached until its data's version stamp changes.
+
+    _data is the snapshot data_version stamps; the leading underscore keeps
+    Streamlit from hashing it on every call.
+    """
+    return DASHBOARD_COMPILERS[dashboard_type](_data, username)
+
+@DASHBOARD_RENDER_SECONDS.time(dashboard="individual")
 def render_individual_dashboard(user_info):
     """Render dashboard for individual contributors"""
     st.markdown(f"### 👤 Welcome back, {user_info['name']}")
     
     username = st.session_state.username.split('.')[0]
-    user_data = DASHBOARD_DATA["individual"].get(username, DASHBOARD_DATA["individual"]["rishab"])
+    data, version = dashboard_snapshot("individual")
+    html = compile_dashboard("individual", username, version, data)
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.markdown("#### 📋 My Current Stories")
-        for i, story in enumerate(user_data["my_stories"]):
-            card_class = "dashboard-card-success" if story['status'] == 'Code Review' else "dashboard-card-alt" if story['status'] == 'In Progress' else "dashboard-card"
-            
-            with st.expander(f"🎯 {story['id']} - {story['title']} ({story['points']} pts)", expanded=False):
-                st.markdown(f"**Status:** {story['status']}")
-                st.markdown(f"**Description:** {story['description']}")
-                
-                st.markdown("**Acceptance Criteria:**")
-                for criteria in story['acceptance_criteria']:
-                    st.markdown(f"• {criteria}")
-                
-                st.markdown("**Tasks:**")
-                for task in story['tasks']:
-                    status_emoji = "✅" if task['status'] == 'Complete' else "🔄" if task['status'] == 'In Progress' else "📋"
-                    st.markdown(f"{status_emoji} {task['task']} - *{task['status']}*")
-            
-            st.markdown(f'<div class="{card_class}"><strong>{story["id"]}</strong> - {story["title"]}<br><span class="status-badge">{story["status"]}</span> <span style="float: right; font-size: 1.2em; font-weight: bold;">{story["points"]} pts</span></div>', unsafe_allow_html=True)
+        for label, details, card in html["stories"]:
+            with st.expander(label, expanded=False):
+                st.markdown(details)
+            st.markdown(card, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("#### 📅 On-Call Schedule")
-        for schedule in DASHBOARD_DATA["individual"]["on_call_schedule"]:
-            card_class = "dashboard-card-danger" if 'Current' in schedule['week'] else "dashboard-card"
-            st.markdown(f'<div class="{card_class}"><strong>{schedule["week"]}</strong><br>{schedule["engineer"]}<br>📞 {schedule["phone"]}</div>', unsafe_allow_html=True)
-        
-        st.markdown("#### 🚨 Recent Incidents")
-        for incident in DASHBOARD_DATA["individual"]["my_incidents"]:
-            priority_class = "dashboard-card-danger" if incident['priority'] == 'P1' else "dashboard-card-alt" if incident['priority'] == 'P2' else "dashboard-card"
-            st.markdown(f'<div class="{priority_class}"><strong>{incident["id"]}</strong><br>{incident["title"]}<br><span class="status-badge">{incident["priority"]} - {incident["status"]}</span></div>', unsafe_allow_html=True)
+        st.markdown(html["side"], unsafe_allow_html=True)
 
+@DASHBOARD_RENDER_SECONDS.time(dashboard="senior_engineer")
 def render_senior_engineer_dashboard(user_info):
     """Render dashboard for senior engineers"""
     st.markdown(f"### 👨‍💼 {user_info['name']} - {user_info['team']} Team Lead")
+    data, version = dashboard_snapshot("senior_engineer")
+    html = compile_dashboard("senior_engineer", "", version, data)
     
-    metrics = DASHBOARD_DATA["senior_engineer"]["team_metrics"]
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(f'<div class="dashboard-card-success"><div class="metric-number">{metrics["sprint_velocity"]}</div><strong>Sprint Velocity</strong><br><small>{metrics["velocity_trend"]}</small></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown(f'<div class="dashboard-card-alt"><div class="metric-number">{metrics["code_coverage"]}%</div><strong>Code Coverage</strong><br><small>{metrics["coverage_trend"]}</small></div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown(f'<div class="dashboard-card"><div class="metric-number">{metrics["bug_escape_rate"]}</div><strong>Bug Escape Rate</strong></div>', unsafe_allow_html=True)
-    with col4:
-        st.markdown(f'<div class="dashboard-card"><div class="metric-number">{metrics["avg_cycle_time"]}</div><strong>Avg Cycle Time</strong></div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("#### 👥 Team Members")
-        for member in DASHBOARD_DATA["senior_engineer"]["team_members"]:
-            card_class = "dashboard-card-success" if member['status'] == 'On Track' else "dashboard-card-alt" if member['status'] == 'Ahead' else "dashboard-card"
-            st.markdown(f'<div class="{card_class}"><strong>{member["name"]}</strong> - {member["role"]}<br>{member["current_task"]}<br><span class="status-badge">{member["status"]}</span> | Load: {member["current_sprint_load"]}</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("#### 🔍 Priority Code Reviews")
-        for pr in DASHBOARD_DATA["senior_engineer"]["priority_code_reviews"]:
-            card_class = "dashboard-card-danger" if pr['urgency'] == 'Critical' else "dashboard-card-alt" if pr['urgency'] == 'Medium' else "dashboard-card"
-            st.markdown(f'<div class="{card_class}"><strong>{pr["pr"]}</strong> - {pr["title"]}<br>By: {pr["author"]} | {pr["complexity"]} complexity<br><span class="status-badge">{pr["status"]}</span></div>', unsafe_allow_html=True)
+    for col, card in zip(st.columns(4), html["metrics"]):
+        col.markdown(card, unsafe_allow_html=True)
+    for col, section in zip(st.columns(2), html["columns"]):
+        col.markdown(section, unsafe_allow_html=True)
 
+@DASHBOARD_RENDER_SECONDS.time(dashboard="director")
 def render_director_dashboard(user_info):
     """Render dashboard for director"""
     st.markdown(f"### 🎯 {user_info['name']} - Leadership Dashboard")
+    data, version = dashboard_snapshot("director")
+    html = compile_dashboard("director", "", version, data)
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("#### 📊 Team Performance")
-        for team, data in DASHBOARD_DATA["director"]["team_burndown"].items():
-            card_class = "dashboard-card-success" if data['velocity'] == 'Ahead' else "dashboard-card-danger" if data['velocity'] == 'At Risk' else "dashboard-card-alt"
-            completion_pct = round((data['completed'] / data['planned']) * 100)
-            st.markdown(f'<div class="{card_class}"><strong>{team.replace("_", " ").title()}</strong><br>Progress: {data["completed"]}/{data["planned"]} ({completion_pct}%)<br><span class="status-badge">{data["velocity"]}</span> | Satisfaction: {data["satisfaction"]}/5.0<br>Blockers: {data["blockers"]}</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("#### 🎯 Strategic Initiatives")
-        for initiative in DASHBOARD_DATA["director"]["strategic_initiatives"]:
-            card_class = "dashboard-card-success" if initiative['status'] == 'On Track' else "dashboard-card" if initiative['status'] == 'Planning' else "dashboard-card-alt"
-            st.markdown(f'<div class="{card_class}"><strong>{initiative["name"]}</strong><br>Progress: {initiative["completion"]}%<br><span class="status-badge">{initiative["status"]}</span><br><small>{initiative["budget"]} | {initiative["timeline"]}</small></div>', unsafe_allow_html=True)
-    
-    # Risk Register and Hiring Pipeline
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("#### ⚠️ Risk Register")
-        for risk in DASHBOARD_DATA["director"]["risk_register"]:
-            risk_class = "dashboard-card-danger" if risk['impact'] == 'High' and risk['probability'] == 'Medium' else "dashboard-card-alt"
-            st.markdown(f'<div class="{risk_class}"><strong>{risk["risk"]}</strong><br>Impact: {risk["impact"]} | Probability: {risk["probability"]}<br><span class="status-badge">{risk["status"]}</span></div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("#### 👔 Hiring Pipeline")
-        for hire in DASHBOARD_DATA["director"]["hiring_pipeline"]:
-            hire_class = "dashboard-card-success" if hire['stage'] == 'Offer Extended' else "dashboard-card-alt"
-            st.markdown(f'<div class="{hire_class}"><strong>{hire["position"]}</strong><br>{hire["team"]} Team | {hire["candidates"]} candidates<br><span class="status-badge">{hire["stage"]}</span><br><small>Target: {hire["hire_date"]}</small></div>', unsafe_allow_html=True)
+    # Team performance and strategic initiatives, then the risk register and hiring pipeline
+    for row in html["rows"]:
+        for col, section in zip(st.columns(2), row):
+            col.markdown(section, unsafe_allow_html=True)
 
+@DASHBOARD_RENDER_SECONDS.time(dashboard="engineering_manager")
 def render_engineering_manager_dashboard(user_info):
     """Render dashboard for engineering manager"""
     st.markdown(f"### 👩‍💼 {user_info['name']} - Engineering Manager")
+    data, version = dashboard_snapshot("engineering_manager")
+    html = compile_dashboard("engineering_manager", "", version, data)
     
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("#### 👥 Direct Reports")
-        for report in DASHBOARD_DATA["engineering_manager"]["direct_reports"]:
-            card_class = "dashboard-card-success" if report['performance'] == 'Exceeds Expectations' else "dashboard-card-alt"
-            st.markdown(f'<div class="{card_class}"><strong>{report["name"]}</strong><br>{report["role"]} - {report["team"]}<br><span class="status-badge">{report["performance"]}</span><br>Load: {report["current_sprint_load"]} | Experience: {report["years_experience"]}y</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("#### 📈 Team Performance")
-        for team, perf in DASHBOARD_DATA["engineering_manager"]["team_performance"].items():
-            efficiency_pct = perf['efficiency'].replace('%', '')
-            card_class = "dashboard-card-success" if int(efficiency_pct) >= 90 else "dashboard-card-alt"
-            st.markdown(f'<div class="{card_class}"><strong>{team.replace("_", " ").title()}</strong><br>Velocity: {perf["velocity"]}/{perf["target"]} | Efficiency: {perf["efficiency"]}<br>Satisfaction: {perf["satisfaction"]}/5.0<br>Issues: {perf["issues"]}</div>', unsafe_allow_html=True)
+    for col, section in zip(st.columns(2), html["columns"]):
+        col.markdown(section, unsafe_allow_html=True)
 
+@DASHBOARD_RENDER_SECONDS.time(dashboard="product_manager")
 def render_product_manager_dashboard(user_info):
     """Render dashboard for product manager"""
     st.markdown(f"### 📊 {user_info['name']} - Product Dashboard")
-    
-    st.markdown("#### 🎯 Active Epics")
-    for epic in DASHBOARD_DATA["product_manager"]["active_epics"]:
-        card_class = "dashboard-card-success" if epic['status'] == 'On Track' else "dashboard-card-danger" if epic['status'] == 'At Risk' else "dashboard-card"
-        st.markdown(f'<div class="{card_class}"><strong>{epic["epic"]}</strong> - {epic["title"]}<br>Progress: {epic["progress"]}% | Target: {epic["target_date"]}<br><span class="status-badge">{epic["status"]}</span><br><small>{epic["business_value"]} | Risk: {epic["risk_level"]}</small></div>', unsafe_allow_html=True)
+    data, version = dashboard_snapshot("product_manager")
+    st.markdown(compile_dashboard("product_manager", "", version, data)["body"], unsafe_allow_html=True)
 
+@DASHBOARD_RENDER_SECONDS.time(dashboard="scrum_master")
 def render_scrum_master_dashboard(user_info):
     """Render dashboard for scrum master"""
     st.markdown(f"### 🏃‍♀️ {user_info['name']} - Agile Dashboard")
+    data, version = dashboard_snapshot("scrum_master")
+    st.markdown(compile_dashboard("scrum_master", "", version, data)["body"], unsafe_allow_html=True)
+
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS or None)
+def dashboard_panel(user_info):
+    """Dashboard tab; reruns on its own refresh schedule without rerunning the page"""
+    if user_info['dashboard_type'] == 'individual':
+        render_individual_dashboard(user_info)
+    elif user_info['dashboard_type'] == 'senior_engineer':
+        render_senior_engineer_dashboard(user_info)
+    elif user_info['dashboard_type'] == 'director':
+        render_director_dashboard(user_info)
+    elif user_info['dashboard_type'] == 'product_manager':
+        render_product_manager_dashboard(user_info)
+    elif user_info['dashboard_type'] == 'scrum_master':
+        render_scrum_master_dashboard(user_info)
+    elif user_info['dashboard_type'] == 'engineering_manager':
+        render_engineering_manager_dashboard(user_info)
+
+@st.fragment
+def chat_panel(user_info):
+    """Chat tab; asking a question reruns only this fragment, not the dashboard or sidebar"""
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
     
-    st.markdown("#### 📈 Team Health Overview")
-    for team, health in DASHBOARD_DATA["scrum_master"]["team_health"].items():
-        card_class = "dashboard-card-success" if health['satisfaction'] >= 4.0 and health['blockers'] <= 1 else "dashboard-card-alt"
-        st.markdown(f'<div class="{card_class}"><strong>{team.replace("_", " ").title()}</strong><br>Satisfaction: {health["satisfaction"]}/5.0 | Capacity: {health["capacity"]}<br>Blockers: {health["blockers"]} | Goal Achievement: {health["sprint_goal_achievement"]}<br>Team Size: {health["team_size"]} | Trend: {health["velocity_trend"]}</div>', unsafe_allow_html=True)
+    render_chat_history(st.session_state.messages, st.session_state.get("conversation_summary", ""))
+    
+    if prompt := st.chat_input("💬 Ask me anything about your team's work..."):
+        # Asking something new collapses the history back to the recent window
+        st.session_state.chat_history_shown = CHAT_HISTORY_WINDOW
+        try:
+            client = initialize_ai_client()
+        except Exception as e:
+            logger.exception("Failed to initialize AI client")
+            st.error(f"❌ LoyaltyAI client failed to start: {e}")
+            return
+        conversation = build_conversation(prompt, st.session_state.messages, st.session_state.get("conversation_summary", ""))
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(prompt)
+        
+        with st.chat_message("assistant", avatar="🤖"):
+            started = time.perf_counter()
+            trace = {}
+            context = get_relevant_context(prompt, user_info, trace)
+            if STREAM_RESPONSES:
+                # Render tokens as they arrive; a stream that fails midway replaces its partial text
+                placeholder = st.empty()
+                answer = ""
+                for text in stream_answer_with_ai(prompt, context, client, user_info, trace, conversation):
+                    answer = "" if text is STREAM_RESET else answer + text
+                    placeholder.markdown(answer)
+            else:
+                answer = generate_answer_with_ai(prompt, context, client, user_info, trace, conversation)
+                st.markdown(answer)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+            log_chat_turn(prompt, context, user_info, trace, time.perf_counter() - started)
+        compact_conversation(client, user_info)
 
 def main():
+    start_metrics_exporters()
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
     
@@ -1282,10 +1546,33 @@ def main():
         
         st.markdown("---")
         
-        client = initialize_ai_client()
+        try:
+            client = initialize_ai_client()
+        except Exception as e:
+            logger.exception("Failed to initialize AI client")
+            st.error(f"❌ LoyaltyAI client failed to start: {e}")
+            client = None
         if client:
-            st.success("✅ LoyaltyAI Connected")
-        else:
+            if client.breaker.state == "closed":
+                st.success("✅ LoyaltyAI Connected")
+            else:
+                st.warning("⚠️ LoyaltyAI unavailable - answering in demo mode")
+            cache = get_answer_cache()
+            if cache:
+                stats = cache.stats()
+                hits = stats["memory_hits"] + stats["disk_hits"] + stats["semantic_hits"]
+                st.caption(f"Answer cache: {stats['hit_rate']:.0%} hit rate ({hits} hits, {stats['misses']} misses)")
+            flights = get_inflight_calls().stats()
+            if flights["deduplicated"]:
+                st.caption(f"Coalesced calls: {flights['deduplicated']} duplicate requests shared {flights['executed']} API calls")
+            usage = get_usage_totals()
+            if usage["calls"]:
+                st.caption(f"Prompt cache: {usage['cache_read_input_tokens']:,} tokens read, {usage['cache_creation_input_tokens']:,} written over {usage['calls']} calls")
+            if model_params_for(user_info) is ECONOMY_MODEL_PARAMS:
+                st.caption("💸 Usage budget reached - answers are shorter for now")
+            if user_info['dashboard_type'] in ('director', 'engineering_manager'):
+                render_usage_summary()
+        elif not os.getenv("ANTHROPIC_API_KEY"):
             st.info("🎭 Demo Mode - Add API key for full AI responses")
         
         st.markdown("---")
@@ -1301,39 +1588,10 @@ def main():
     tab1, tab2 = st.tabs(["📊 Dashboard", "💬 Ask LoyaltyAI"])
     
     with tab1:
-        if user_info['dashboard_type'] == 'individual':
-            render_individual_dashboard(user_info)
-        elif user_info['dashboard_type'] == 'senior_engineer':
-            render_senior_engineer_dashboard(user_info)
-        elif user_info['dashboard_type'] == 'director':
-            render_director_dashboard(user_info)
-        elif user_info['dashboard_type'] == 'product_manager':
-            render_product_manager_dashboard(user_info)
-        elif user_info['dashboard_type'] == 'scrum_master':
-            render_scrum_master_dashboard(user_info)
-        elif user_info['dashboard_type'] == 'engineering_manager':
-            render_engineering_manager_dashboard(user_info)
+        dashboard_panel(user_info)
     
     with tab2:
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-        
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"], avatar="🤖" if message["role"] == "assistant" else "👤"):
-                st.markdown(message["content"])
-        
-        if prompt := st.chat_input("💬 Ask me anything about your team's work..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            
-            with st.chat_message("user", avatar="👤"):
-                st.markdown(prompt)
-            
-            with st.chat_message("assistant", avatar="🤖"):
-                context = get_relevant_context(prompt, user_info)
-                client = initialize_ai_client()
-                answer = generate_answer_with_ai(prompt, context, client, user_info)
-                st.markdown(answer)
-                st.session_state.messages.append({"role": "assistant", "content": answer})
+        chat_panel(user_info)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
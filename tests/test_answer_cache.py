@@ -0,0 +1,52 @@
+"""Paraphrase lookups in the answer cache, scoped the way the chatbot scopes them."""
+
+import pytest
+
+import team_chatbot
+from answer_cache import AnswerCache
+
+PARAPHRASES = [
+    ("who is on call", ["whos oncall this week", "on-call engineer?", "who's on call right now?", "who is on call this week"]),
+    ("how do i deploy", ["what's the deployment process"]),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(path=tmp_path / "answers.db")
+
+
+@pytest.fixture
+def user():
+    return team_chatbot.USERS["rishab.bhat"]
+
+
+def cached_lookup(cache, question, user, store=None):
+    """Look up (or store) an answer the way the chat panel does, with fresh retrieval for the question"""
+    trace = {}
+    context = team_chatbot.get_relevant_context(question, user, trace)
+    role = team_chatbot.answer_cache_role(user)
+    params = team_chatbot.model_params_for(user)
+    paraphrase = team_chatbot.answer_cache_paraphrase(question, context, user, trace["intent"])
+    if store is not None:
+        cache.store(question, context, role, params, store, **paraphrase)
+        return None
+    return cache.lookup(question, context, role, params, **paraphrase)
+
+
+@pytest.mark.parametrize("original, paraphrases", PARAPHRASES)
+def test_paraphrases_hit(cache, user, original, paraphrases):
+    cached_lookup(cache, original, user, store="cached answer")
+    for question in paraphrases:
+        assert cached_lookup(cache, question, user) == "cached answer", question
+    assert cache.stats()["semantic_hits"] == len(paraphrases)
+
+
+def test_extra_detail_misses(cache, user):
+    cached_lookup(cache, "who is on call", user, store="cached answer")
+    assert cached_lookup(cache, "who is on call for the kafka migration next month", user) is None
+
+
+def test_other_intent_misses(cache, user):
+    cached_lookup(cache, "who is on call", user, store="cached answer")
+    assert cached_lookup(cache, "how do i deploy", user) is None
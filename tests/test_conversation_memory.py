@@ -0,0 +1,29 @@
+"""Follow-up detection decides whether a question is sent with the conversation or shared via the answer cache."""
+
+import pytest
+
+from conversation_memory import is_follow_up
+
+
+@pytest.mark.parametrize("question", [
+    "what else is he doing",
+    "what is his phone number",
+    "tell me more",
+    "and scott?",
+    "what about britney",
+    "what's that",
+])
+def test_follow_ups(question):
+    assert is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "who is on call",
+    "how do i fix it",
+    "tell me more about kafka",
+    "what is the kafka migration and its status",
+    "does scott know his on call dates",
+    "what is this sprint about",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question)
@@ -0,0 +1,38 @@
+"""Prompt layout: the cacheable prefix must be long enough to be cached with default settings."""
+
+import pytest
+
+import team_chatbot
+from token_estimate import estimate_tokens
+from usage_ledger import prompt_cache_min_tokens
+
+QUESTIONS = ["who is on call", "how do i deploy", "tell me the burndown", "what is the weather like"]
+
+
+@pytest.mark.parametrize("username", sorted(team_chatbot.USERS))
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_default_prompt_sets_cache_breakpoint(username, question):
+    user = team_chatbot.USERS[username]
+    model = team_chatbot.MODEL_PARAMS["model"]
+    context = team_chatbot.get_relevant_context(question, user)
+    prompt = team_chatbot.build_prompt(question, context, user, model=model)
+    breakpoints = [block for block in prompt["system"] if "cache_control" in block]
+    assert breakpoints == [prompt["system"][0]]
+    assert estimate_tokens(breakpoints[0]["text"]) >= prompt_cache_min_tokens(model)
+
+
+def test_prefix_is_shared_across_questions():
+    user = team_chatbot.USERS["rishab.bhat"]
+    prefixes = {
+        team_chatbot.build_prompt(question, team_chatbot.get_relevant_context(question, user), user)["system"][0]["text"]
+        for question in QUESTIONS
+    }
+    assert len(prefixes) == 1
+
+
+def test_pinned_context_is_not_repeated():
+    user = team_chatbot.USERS["rishab.bhat"]
+    context = team_chatbot.get_relevant_context("who is on call", user)
+    prompt = team_chatbot.build_prompt("who is on call", context, user)
+    on_call = team_chatbot.normalize_context_block(team_chatbot.INTENT_CONTEXTS["on_call"])
+    assert sum(block["text"].count(on_call) for block in prompt["system"]) == 1
@@ -0,0 +1,41 @@
+"""A stream that fails midway must not leave its partial text in the answer."""
+
+import team_chatbot
+
+
+class _FailingStream:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __enter__(self):
+        def text_stream():
+            yield from self.parts
+            raise ConnectionError("connection reset mid-stream")
+        self.text_stream = text_stream()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Messages:
+    def stream(self, **params):
+        return _FailingStream(["Scott is ", "on call"])
+
+
+class _Client:
+    messages = _Messages()
+
+
+def test_partial_stream_is_reset_before_the_fallback():
+    user = team_chatbot.USERS["rishab.bhat"]
+    question = "failing stream test question"
+    trace = {}
+    context = team_chatbot.get_relevant_context(question, user, trace)
+    chunks = list(team_chatbot.stream_answer_with_ai(question, context, _Client(), user, trace))
+
+    reset = chunks.index(team_chatbot.STREAM_RESET)
+    assert chunks[:reset] == ["Scott is ", "on call"]
+    answer = "".join(chunks[reset + 1:])
+    assert answer.startswith("I apologize")
+    assert trace["truncated"] and trace["error"] == "ConnectionError"
@@ -0,0 +1,11 @@
+"""
+Rough token counts without calling the API.
+
+One estimate shared by the prompt budgets, conversation trimming and the mock
+Messages API, so budgets and reported usage never disagree about a text's size.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
@@ -0,0 +1,97 @@
+"""
+Token and cost accounting for model calls, attributed to user, dashboard type and intent.
+
+Usage is added to per-minute buckets, so totals over any rolling window up to
+the retention period are a sum over a few buckets rather than a scan of every
+call. Costs come from MODEL_PRICES, in USD per million tokens.
+"""
+
+import threading
+import time
+from collections import deque
+
+# USD per million tokens: input, output, prompt cache read, prompt cache write
+MODEL_PRICES = {
+    "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00, "cache_read": 0.08, "cache_write": 1.00},
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25, "cache_read": 0.03, "cache_write": 0.30},
+    "claude-3-5-sonnet-20241022": {"input": 3.00, "output": 15.00, "cache_read": 0.30, "cache_write": 3.75},
+}
+
+# Shortest prompt prefix, in tokens, the prompt cache will store for each model; shorter
+# prefixes marked with cache_control are processed uncached
+PROMPT_CACHE_MIN_TOKENS = {
+    "claude-3-5-haiku-20241022": 2048,
+    "claude-3-haiku-20240307": 2048,
+    "claude-3-5-sonnet-20241022": 1024,
+}
+DEFAULT_PROMPT_CACHE_MIN_TOKENS = 1024
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+GROUP_FIELDS = ("user", "dashboard_type", "intent")
+
+
+def usage_cost(model: str, usage: dict) -> float:
+    """Cost of one call in USD; 0 for models without a price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    return (
+        usage.get("input_tokens", 0) * prices["input"]
+        + usage.get("output_tokens", 0) * prices["output"]
+        + usage.get("cache_read_input_tokens", 0) * prices["cache_read"]
+        + usage.get("cache_creation_input_tokens", 0) * prices["cache_write"]
+    ) / 1_000_000
+
+
+def prompt_cache_min_tokens(model: str) -> int:
+    return PROMPT_CACHE_MIN_TOKENS.get(model, DEFAULT_PROMPT_CACHE_MIN_TOKENS)
+
+
+class UsageLedger:
+    """Rolling per-minute usage totals keyed by (user, dashboard type, intent)"""
+
+    def __init__(self, bucket_seconds: float = 60, retention_seconds: float = 86400):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self._buckets = deque()  # (bucket start, {(user, dashboard_type, intent): totals})
+        self._lock = threading.Lock()
+
+    def _bucket(self, now: float) -> dict:
+        start = now - now % self.bucket_seconds
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append((start, {}))
+            while self._buckets and self._buckets[0][0] <= now - self.retention_seconds:
+                self._buckets.popleft()
+        return self._buckets[-1][1]
+
+    def record(self, user: str, dashboard_type: str, intent: str, model: str, usage: dict) -> float:
+        """Add one call's usage and return its cost"""
+        cost = usage_cost(model, usage)
+        with self._lock:
+            entries = self._bucket(time.time())
+            totals = entries.setdefault((user, dashboard_type, intent or "none"), dict.fromkeys(("calls", *USAGE_FIELDS, "cost_usd"), 0))
+            totals["calls"] += 1
+            for field in USAGE_FIELDS:
+                totals[field] += usage.get(field, 0)
+            totals["cost_usd"] += cost
+        return cost
+
+    def totals(self, group_by: str, window_seconds: float = 3600) -> dict:
+        """Usage over the last window_seconds, summed per user, dashboard_type or intent"""
+        position = GROUP_FIELDS.index(group_by)
+        cutoff = time.time() - window_seconds
+        grouped = {}
+        with self._lock:
+            for start, entries in self._buckets:
+                # A bucket counts once any of it falls inside the window
+                if start + self.bucket_seconds <= cutoff:
+                    continue
+                for key, totals in entries.items():
+                    summed = grouped.setdefault(key[position], dict.fromkeys(totals, 0))
+                    for field, value in totals.items():
+                        summed[field] += value
+        return grouped
+
+    def spend(self, group_by: str, value: str, window_seconds: float = 3600) -> float:
+        """USD spent by one user, dashboard type or intent over the window"""
+        return self.totals(group_by, window_seconds).get(value, {}).get("cost_usd", 0.0)